@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('assets', 'assets')],
-    hiddenimports=['tkcalendar', 'PIL.Image', 'PIL.ImageTk', 'ui.add_employee', 'ui.check_employee', 'ui.employee_attendance'],
+    hiddenimports=['tkcalendar', 'PIL.Image', 'PIL.ImageTk', 'ui.add_employee', 'ui.check_employee', 'ui.employee_attendance', 'ui.live_monitor', 'ui.diagnostics', 'ui.terminals', 'ui.biometric_audit', 'ui.department_report'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
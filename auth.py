@@ -1,22 +1,31 @@
 # auth.py
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from config import BASE_URL, USERNAME, PASSWORD
+from utils import api, sites
 from utils.state import set_token
 
-def login():
+def login(site=None):
+    s = sites.get(site)
     try:
-        url = f"{BASE_URL}/api-token-auth/"
-        response = requests.post(url, json={"username": USERNAME, "password": PASSWORD})
+        url = f"{s['base_url'].rstrip('/')}/api-token-auth/"
+        response = requests.post(url, json={"username": s["username"], "password": s["password"]},
+                                 timeout=api.timeouts(25))
         response.raise_for_status()
         token = response.json().get("token")
 
         if token:
-            print("[LOGIN SUCCESS] Token received:", token)
-            set_token(token)
+            print(f"[LOGIN SUCCESS] {s['name']}: Token received:", token)
+            set_token(token, s["name"])
             return True
         else:
-            print("[LOGIN FAIL] No token in response")
+            print(f"[LOGIN FAIL] {s['name']}: No token in response")
             return False
     except Exception as e:
-        print("[LOGIN ERROR]", e)
+        print(f"[LOGIN ERROR] {s['name']}:", e)
         return False
+
+def login_all():
+    """Log in to every configured site in parallel; {site name: ok}."""
+    names = sites.names()
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        return dict(zip(names, pool.map(login, names)))
@@ -0,0 +1,98 @@
+# File: bench.py
+# Wire-path benchmark against the local stub server (stub_server.py).
+# Compares the old per-call requests.get crawl with utils.api (big pages,
+# gzip, ?fields= projection, orjson) and prints bytes on the wire + wall time,
+# then one employee's date window with server filters ignored: full crawl vs
+# page bisection. Last, grouping a large crawl (--agg-rows punches) on one
+# core vs the utils.aggregate process pool.
+#
+#   python bench.py --employees 500 --days 30 --latency 0.005
+import os, sys, time, tempfile, argparse
+
+# keep learned page sizes out of the real %APPDATA%/ALPAGO
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="alpago-bench-")
+
+import requests
+import stub_server
+from utils.state import set_token, get_auth_headers
+from utils import api, cache
+
+TX = "/iclock/api/transactions/"
+
+def legacy_paginate(url, params=None):
+    """The pre-utils.api crawl: new connection per page, server default page size, resp.json()."""
+    headers = get_auth_headers()
+    items, next_url = [], url
+    while next_url:
+        r = requests.get(next_url, headers=headers,
+                         params=(params if ('?' not in next_url) else None), timeout=25)
+        if r.status_code != 200:
+            break
+        payload = r.json() or {}
+        items.extend(payload.get("data") or [])
+        next_url = payload.get("next")
+    return items
+
+def run(label, srv, fn, url):
+    stub_server.reset_stats(srv)
+    cache.invalidate()  # measure the wire, not the response cache
+    t0 = time.perf_counter()
+    rows = fn(url)
+    dt = time.perf_counter() - t0
+    st = dict(srv.stats)
+    print(f"{label:<22} rows={len(rows):>8}  requests={st['requests']:>6}  "
+          f"bytes={st['bytes']:>12,}  time={dt:8.3f}s")
+    return st["bytes"], dt
+
+def main():
+    ap = argparse.ArgumentParser(description="ZKBioTime wire-path benchmark")
+    ap.add_argument("--employees", type=int, default=300)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--latency", type=float, default=0.002, help="simulated server latency per request (s)")
+    ap.add_argument("--agg-rows", type=int, default=1_000_000, help="punches for the aggregation benchmark")
+    a = ap.parse_args()
+
+    srv, base = stub_server.start(latency=a.latency, employees=a.employees, days=a.days)
+    set_token(stub_server.TOKEN)
+    url = base + TX
+    print(f"[BENCH] {len(srv.data[TX])} transactions, orjson={'yes' if api.HAVE_ORJSON else 'no'}")
+
+    b0, t0 = run("legacy (requests.get)", srv, legacy_paginate, url)
+    run("utils.api (learning)", srv, api.paginate, url)  # first crawl discovers the max page size
+    b1, t1 = run("utils.api", srv, api.paginate, url)
+
+    print(f"[BENCH] bytes on wire: -{100.0 * (b0 - b1) / max(b0, 1):.1f}%   "
+          f"wall time: -{100.0 * (t0 - t1) / max(t0, 1e-9):.1f}%")
+
+    # one employee, 3 days in the middle of the data; the stub ignores filters
+    from ui import employee_attendance as ea
+    tx = srv.data[TX]
+    mid = tx[len(tx) // 2]["punch_time"][:10]
+    code = tx[len(tx) // 2]["emp_code"]
+    end = ea._to_date(mid) + ea.timedelta(days=2)
+    end = end.strftime("%Y-%m-%d")
+    full = lambda u: ea._filter_and_group(api.paginate(u), code, mid, end)
+    bis = lambda u: ea._filter_and_group(ea._bisect_window(u, mid, end), code, mid, end)
+    stub_server.reset_stats(srv)
+    print(f"[BENCH] window {mid}..{end} for {code}:")
+    run("full crawl", srv, lambda u: list(full(u).items()), url)
+    run("page bisection", srv, lambda u: list(bis(u).items()), url)
+    srv.shutdown()
+
+    # all employees, whole period: the report-server case
+    from utils import aggregate
+    big = (tx * (a.agg_rows // len(tx) + 1))[:a.agg_rows]
+    cores = aggregate.workers()
+    timings = {}
+    for label, n in (("1 core", "1"), (f"{cores} processes", str(cores))):
+        os.environ["ALPAGO_AGG_WORKERS"] = n
+        aggregate.group(big[:aggregate.PARALLEL_MIN])  # warm the pool up
+        t0 = time.perf_counter()
+        out = aggregate.group(big)
+        timings[label] = time.perf_counter() - t0
+        print(f"aggregate {label:<12} rows={len(big):>8}  groups={len(out):>7}  time={timings[label]:8.3f}s")
+    one, many = timings.values()
+    print(f"[BENCH] aggregation speed-up: x{one / max(many, 1e-9):.1f} on {cores} cores")
+
+if __name__ == "__main__":
+    sys.exit(main())
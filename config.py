@@ -3,3 +3,26 @@ USERNAME = "x" #change
 PASSWORD = "x" #change
 
 #server config all (x) should be updated
+
+# Multi-site: one entry per ZKBioTime server. Leave empty to use the single
+# server above. The first entry is the primary site (new employees go there).
+SITES = [
+    # {"name": "HQ",      "base_url": "http://x:x", "username": "x", "password": "x"},
+    # {"name": "Plant 2", "base_url": "http://y:y", "username": "y", "password": "y"},
+]
+
+# Shifts for the attendance report. Leave empty to group punches by calendar
+# day. end <= start means the shift ends the next day; "early"/"late" are the
+# minutes a punch may fall before the start / after the end (default 120/240).
+SHIFTS = [
+    # {"name": "Day",   "start": "08:00", "end": "17:00"},
+    # {"name": "Night", "start": "22:00", "end": "06:00", "early": 90, "late": 180},
+]
+
+# Data-quality flags on attendance days. 0 / False / [] turns a rule off;
+# with no terminals listed, any terminal is expected.
+ANOMALY_RULES = {
+    "double_tap_seconds": 60,   # two punches closer than this
+    "odd_punches": True,        # an odd punch count (missing in or out)
+    "terminals": [],            # expected terminal serials/aliases; any other is flagged
+}
@@ -0,0 +1,205 @@
+# File: loadtest.py
+# Multi-operator load test against the local stub server (stub_server.py).
+# Each simulated HR operator is its own process with its own %APPDATA%
+# (response cache, governor, local attendance store), like one PC per
+# operator, and drives the real fetch functions headlessly. By default every
+# action starts cold (caches and local store cleared) so the server is what
+# gets measured; --warm keeps them, and "local %" shows the actions answered
+# without a request.
+#
+#   report  ui.employee_attendance.fetch_employee_transactions (month window)
+#   lookup  ui.check_employee.lookup_employee (the record returned must match)
+#   lists   departments + positions, as opening Add Employee loads them
+#
+# Between actions an operator "thinks" (exponential, mean --think seconds).
+# Concurrency steps through --levels; for each step the tool prints
+# throughput, p50/p95/p99 latency and error rate, and names the first step
+# where p95 passes KNEE_FACTOR x the single-operator p95 or errors pass 1%.
+#
+#   python loadtest.py --levels 1,4,8,16,32 --duration 30 --latency 0.02 --workers 8
+import os, sys, math, time, random, argparse, tempfile
+import multiprocessing as mp
+
+import stub_server
+
+TX = "/iclock/api/transactions/"
+EMP = "/personnel/api/employees/"
+DEFAULT_MIX = "report=6,lookup=3,lists=1"   # month-end: mostly reports
+KNEE_FACTOR = 2.0
+MAX_ERROR_RATE = 0.01
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("report", "lookup", "lists"):
+            raise SystemExit(f"unknown action in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not values:
+        return None
+    return values[min(len(values), max(1, math.ceil(p / 100.0 * len(values)))) - 1]
+
+# ==== one operator (child process) ====
+def _session(n, base, opts, codes, window, barrier, out):
+    os.environ["APPDATA"] = tempfile.mkdtemp(prefix=f"alpago-load-{n}-")  # this operator's PC
+    if not opts["verbose"]:
+        sys.stdout = open(os.devnull, "w")
+    import config
+    config.BASE_URL = base
+    from utils.state import set_token
+    from utils import cache, prefetch, rollups
+    from ui import check_employee
+    from ui import employee_attendance as ea
+    set_token(stub_server.TOKEN)
+
+    rnd = random.Random(opts["seed"] * 1000 + n)
+    names, weights = zip(*opts["mix"].items())
+    think = opts["think"]
+
+    def act(name):
+        if not opts["warm"]:  # every action as a first-time client
+            cache.invalidate()
+            prefetch.invalidate("departments"); prefetch.invalidate("positions")
+            rollups.forget(base)
+        if name == "report":
+            ea.fetch_employee_transactions(rnd.choice(codes), *window)
+        elif name == "lookup":
+            code = rnd.choice(codes)
+            found = check_employee.lookup_employee(code)
+            if [str(e.get("emp_code")) for e in found] != [code]:
+                raise LookupError(f"lookup {code} returned {len(found)} records")
+        else:
+            for lst in ("departments", "positions"):
+                data, stale = prefetch.get(lst)
+                if stale is not None or not data:
+                    raise RuntimeError(f"{lst} not loaded")
+
+    samples = []
+    try:
+        barrier.wait()
+        deadline = time.perf_counter() + opts["duration"]
+        time.sleep(rnd.uniform(0, think))  # operators don't all start on the same second
+        while time.perf_counter() < deadline:
+            name = rnd.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            sent = cache.stats()["misses"]
+            err = None
+            try:
+                act(name)
+            except Exception as e:
+                err = e.__class__.__name__
+            samples.append((name, time.perf_counter() - t0, err, cache.stats()["misses"] == sent))
+            time.sleep(min(rnd.expovariate(1.0 / think), 5 * think) if think > 0 else 0)
+    finally:
+        out.put(samples)
+
+# ==== one concurrency level ====
+def run_level(users, srv, base, opts, codes, window):
+    ctx = mp.get_context("spawn")  # what Windows does anyway; no inherited client state
+    barrier, out = ctx.Barrier(users + 1), ctx.Queue()
+    procs = [ctx.Process(target=_session, args=(i, base, opts, codes, window, barrier, out), daemon=True)
+             for i in range(users)]
+    for p in procs:
+        p.start()
+    barrier.wait(timeout=120)  # every operator is started and imported
+    stub_server.reset_stats(srv)
+    t0 = time.perf_counter()
+    samples = []
+    for _ in procs:
+        samples.extend(out.get(timeout=opts["duration"] + 300))
+    elapsed = time.perf_counter() - t0
+    server = dict(srv.stats)
+    for p in procs:
+        p.join(timeout=10)
+
+    lat = sorted(s[1] for s in samples)
+    errors = [s for s in samples if s[2]]
+    row = {"users": users, "actions": len(samples), "elapsed": elapsed,
+           "throughput": len(samples) / max(elapsed, 1e-9),
+           "p50": percentile(lat, 50), "p95": percentile(lat, 95), "p99": percentile(lat, 99),
+           "max": lat[-1] if lat else None,
+           "error_rate": len(errors) / max(len(samples), 1),
+           "local_rate": sum(1 for s in samples if s[3]) / max(len(samples), 1),
+           "server_rps": server["requests"] / max(elapsed, 1e-9),
+           "server_mb": server["bytes"] / 1e6}
+    for name in opts["mix"]:
+        row[f"{name}_p95"] = percentile(sorted(s[1] for s in samples if s[0] == name), 95)
+    kinds = {}
+    for s in errors:
+        kinds[s[2]] = kinds.get(s[2], 0) + 1
+    row["errors"] = ", ".join(f"{k} x{v}" for k, v in sorted(kinds.items()))
+    return row
+
+def _ms(v):
+    return "-" if v is None else f"{v * 1000:.0f}"
+
+def print_row(row, mix):
+    per = "  ".join(f"{name}={_ms(row[f'{name}_p95']):>6}" for name in mix)
+    print(f"{row['users']:>5}  {row['actions']:>7}  {row['throughput']:>7.2f}  {_ms(row['p50']):>7}  "
+          f"{_ms(row['p95']):>7}  {_ms(row['p99']):>7}  {100 * row['error_rate']:>6.1f}%  "
+          f"{100 * row['local_rate']:>6.1f}%  {row['server_rps']:>7.1f}  {per}", flush=True)
+    if row["errors"]:
+        print(f"{'':>7}errors: {row['errors']}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-operator load test against the ZKBioTime stub")
+    ap.add_argument("--levels", default="1,2,4,8,16", help="operator counts to step through")
+    ap.add_argument("--duration", type=float, default=30, help="seconds per level")
+    ap.add_argument("--think", type=float, default=3.0, help="mean think time between actions (s)")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="action weights, e.g. report=6,lookup=3,lists=1")
+    ap.add_argument("--warm", action="store_true",
+                    help="keep each operator's caches and local store between actions "
+                         "(repeat reports are then answered locally)")
+    ap.add_argument("--employees", type=int, default=300)
+    ap.add_argument("--days", type=int, default=31)
+    ap.add_argument("--latency", type=float, default=0.02, help="simulated server latency per request (s)")
+    ap.add_argument("--workers", type=int, default=8, help="requests the stub serves at once (0: no limit)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--csv", help="also write the per-level results to this CSV file")
+    ap.add_argument("--verbose", action="store_true", help="keep the operators' console output")
+    a = ap.parse_args()
+
+    levels = [int(x) for x in a.levels.split(",") if x.strip()]
+    opts = {"duration": a.duration, "think": a.think, "mix": parse_mix(a.mix), "warm": a.warm,
+            "seed": a.seed, "verbose": a.verbose}
+    srv, base = stub_server.start(latency=a.latency, workers=a.workers, employees=a.employees, days=a.days)
+    tx = srv.data[TX]
+    codes = sorted({str(e["emp_code"]) for e in srv.data[EMP]})
+    window = (tx[0]["punch_time"][:10], tx[-1]["punch_time"][:10])
+    print(f"[LOAD] {len(tx)} transactions, {len(codes)} employees, report window {window[0]}..{window[1]}, "
+          f"server latency {a.latency * 1000:.0f} ms, {a.workers or 'unlimited'} server workers"
+          f", {'warm' if a.warm else 'cold'} clients")
+    print(f"{'users':>5}  {'actions':>7}  {'act/s':>7}  {'p50 ms':>7}  {'p95 ms':>7}  {'p99 ms':>7}  "
+          f"{'errors':>7}  {'local':>7}  {'req/s':>7}  p95 ms per action")
+
+    rows = []
+    for users in levels:
+        row = run_level(users, srv, base, opts, codes, window)
+        rows.append(row)
+        print_row(row, opts["mix"])
+    srv.shutdown()
+
+    base_p95 = rows[0]["p95"] if rows else None
+    knee = next((r for r in rows[1:] if r["error_rate"] > MAX_ERROR_RATE or
+                 (base_p95 and r["p95"] and r["p95"] > KNEE_FACTOR * base_p95)), None)
+    if knee:
+        print(f"[LOAD] degrades at {knee['users']} operators "
+              f"(p95 {_ms(knee['p95'])} ms vs {_ms(base_p95)} ms alone, errors {100 * knee['error_rate']:.1f}%)")
+    else:
+        print(f"[LOAD] no degradation up to {levels[-1]} operators")
+
+    if a.csv:
+        import csv
+        with open(a.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]))
+            w.writeheader()
+            w.writerows(rows)
+        print(f"[LOAD] results written to {a.csv}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,12 @@
 # File: main.py
-import os, sys, json, hashlib, base64
+import os, sys, json, hashlib, base64, multiprocessing
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-from auth import login as remote_login
+from auth import login_all
 from ui.main_menu import launch_menu
 from utils.state import get_token, get_auth_headers
+from utils import outbox, prefetch, sites
 
 TITLE = "ATTENDANCE"
 ADMIN_USERS = {"IT"}  # only these can manage users
@@ -226,28 +227,46 @@ def main():
         print("[ERROR] Local login failed or cancelled.")
         return
 
-    # Continue with your remote/API login
-    if remote_login():
+    # Continue with your remote/API login (every configured site, in parallel)
+    logins = login_all()
+    online = any(logins.values())
+    for name, ok in logins.items():
+        if not ok and online:
+            print(f"[WARN] Server login failed for site {name}; its results will show as errors.")
+    if online:
         print("[DEBUG] Final token after login:", get_token())
         print("[DEBUG] Headers being passed:", get_auth_headers())
-
-        menu_kwargs = {
-            "title": TITLE,
-            "theme": "black",
-            "logo_path": asset_path("newg.png"),
-            "icon_path": None,
-            "modules": [
-                {"label": "➕ Add Employee",      "module": "add_employee",         "entry_points": ["open_add_employee", "main", "run"]},
-                {"label": "🔎 Check Employee",    "module": "check_employee",       "entry_points": ["open_check_employee", "main", "run"]},
-                {"label": "🕒 Employee Attendance","module": "employee_attendance", "entry_points": ["open_department_attendance", "main", "run"]},
-            ],
-        }
-        try:
-            launch_menu(**menu_kwargs)
-        except TypeError:
-            launch_menu()
+        if logins.get(sites.primary()):
+            prefetch.start()  # warm departments/positions/employees/today while the menu is idle
+    elif outbox.offline_enabled():
+        print("[WARN] Server login failed; continuing in offline mode (queued writes, cached reads).")
     else:
         print("[ERROR] Server login failed.")
+        return
+
+    outbox.start()  # flush anything queued in an earlier session
+
+    menu_kwargs = {
+        "title": TITLE,
+        "theme": "black",
+        "logo_path": asset_path("newg.png"),
+        "icon_path": None,
+        "modules": [
+            {"label": "➕ Add Employee",      "module": "add_employee",         "entry_points": ["open_add_employee", "main", "run"]},
+            {"label": "🔎 Check Employee",    "module": "check_employee",       "entry_points": ["open_check_employee", "main", "run"]},
+            {"label": "🕒 Employee Attendance","module": "employee_attendance", "entry_points": ["open_department_attendance", "main", "run"]},
+            {"label": "🏢 Department Report", "module": "department_report",    "entry_points": ["open_department_report", "main", "run"]},
+            {"label": "📡 Live Attendance",   "module": "live_monitor",         "entry_points": ["open_live_monitor", "main", "run"]},
+            {"label": "🖲️ Terminals",         "module": "terminals",            "entry_points": ["open_terminals", "main", "run"]},
+            {"label": "🧬 Biometric Audit",   "module": "biometric_audit",      "entry_points": ["open_biometric_audit", "main", "run"]},
+            {"label": "🩺 Diagnostics",       "module": "diagnostics",          "entry_points": ["open_diagnostics", "main", "run"]},
+        ],
+    }
+    try:
+        launch_menu(**menu_kwargs)
+    except TypeError:
+        launch_menu()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # frozen build: let aggregation workers start
     main()
@@ -0,0 +1,204 @@
+# File: stub_server.py
+# Local stand-in for a ZKBioTime server, for benchmarks and offline testing.
+# Serves generated departments / positions / employees / transactions with
+# DRF-style paging (?page, ?page_size, "next"), ?fields= projection and gzip.
+# The filters in FILTERS are honoured (ZKBioTime's emp_code / emp / terminal_sn /
+# start_time / end_time, plus id__gt and upload_time__gte); others are ignored,
+# as the real server ignores parameters it does not know.
+#
+#   python stub_server.py --port 8001 --employees 500 --days 30
+import gzip, json, random, threading, time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 500
+TOKEN = "stub-token"
+
+FILTERS = {
+    "emp_code":         lambda r, v: str(r.get("emp_code")) == v,
+    "emp":              lambda r, v: str(r.get("emp")) == v,
+    "terminal_sn":      lambda r, v: r.get("terminal_sn") == v,
+    "start_time":       lambda r, v: str(r.get("punch_time") or "") >= v,
+    "end_time":         lambda r, v: str(r.get("punch_time") or "") <= v,
+    "id__gt":           lambda r, v: r["id"] > int(v),
+    "upload_time__gte": lambda r, v: str(r.get("upload_time") or "") >= v,
+}
+
+def build_dataset(employees=200, days=14, start="2025-01-01", seed=7, terminals=6):
+    rnd = random.Random(seed)
+    depts = [{"id": 1, "dept_code": "1", "dept_name": "Head Office", "parent_dept": None}]
+    for i in range(2, 13):
+        depts.append({"id": i, "dept_code": str(i), "dept_name": f"Dept {i:02d}",
+                      "parent_dept": 1 if i < 5 else rnd.randint(2, 4)})
+    positions = [{"id": i, "position_code": f"P{i}", "position_name": f"Position {i}",
+                  "parent_position": None} for i in range(1, 9)]
+    terminals = [{"id": i, "sn": f"TERM{i:04d}", "alias": f"Gate {i}", "state": 1,
+                  "ip_address": f"10.0.{i // 250}.{i % 250 + 1}", "area": {"id": 2, "area_name": "ALPAGO"},
+                  "last_activity": None}
+                 for i in range(1, terminals + 1)]
+    emps = []
+    for i in range(1, employees + 1):
+        d = depts[rnd.randrange(len(depts))]
+        p = positions[rnd.randrange(len(positions))]
+        emps.append({
+            "id": i, "emp_code": str(1000 + i), "first_name": f"Emp{i}", "last_name": "",
+            "department": {"id": d["id"], "dept_code": d["dept_code"], "dept_name": d["dept_name"]},
+            "position": {"id": p["id"], "position_code": p["position_code"], "position_name": p["position_name"]},
+            "area": [{"id": 2, "area_code": "2", "area_name": "ALPAGO"}],
+            "fingerprint": "1" if rnd.random() < 0.8 else "", "face": "", "palm": "", "vl_face": "",
+            "hire_date": "2020-01-01", "gender": "M", "mobile": "", "email": "", "enroll_sn": "",
+        })
+    tx, tid = [], 1
+    day0 = datetime.strptime(start, "%Y-%m-%d")
+    for n in range(days):
+        day = day0 + timedelta(days=n)
+        punches = []
+        for e in emps:
+            if rnd.random() < 0.1:
+                continue
+            t_in = day + timedelta(hours=8, minutes=rnd.randint(-30, 45))
+            t_out = day + timedelta(hours=17, minutes=rnd.randint(-30, 90))
+            punches += [(t_in, e), (t_out, e)]
+        punches.sort(key=lambda x: x[0])
+        for when, e in punches:
+            term = terminals[e["id"] % len(terminals)]
+            tx.append({
+                "id": tid, "emp": e["id"], "emp_code": e["emp_code"],
+                "first_name": e["first_name"], "last_name": "", "department": e["department"]["dept_name"],
+                "position": e["position"]["position_name"],
+                "punch_time": when.strftime("%Y-%m-%d %H:%M:%S"), "punch_state": "0",
+                "punch_state_display": "Check In", "verify_type": 1, "verify_type_display": "Fingerprint",
+                "work_code": "", "gps_location": "", "area_alias": "ALPAGO",
+                "terminal_sn": term["sn"], "terminal_alias": term["alias"], "temperature": "0.0",
+                "upload_time": (when + timedelta(seconds=rnd.randint(1, 90))).strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            tid += 1
+            term["last_activity"] = max(term["last_activity"] or "", tx[-1]["upload_time"])
+    return {
+        "/personnel/api/departments/": depts,
+        "/personnel/api/positions/": positions,
+        "/personnel/api/employees/": emps,
+        "/iclock/api/terminals/": terminals,
+        "/iclock/api/transactions/": tx,
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, code, obj):
+        body = json.dumps(obj).encode("utf-8")
+        gz = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gz:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        srv = self.server
+        with srv.lock:
+            srv.stats["requests"] += 1
+            srv.stats["bytes"] += len(body)
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(n) or b"{}")
+        except Exception:
+            return {}
+
+    # requests wait for one of the server's worker slots (--workers), like a real app server
+    def do_POST(self):
+        with self.server.slots:
+            return self._post()
+
+    def do_GET(self):
+        with self.server.slots:
+            return self._get()
+
+    def _post(self):
+        path = urlsplit(self.path).path
+        body = self._body()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if path == "/api-token-auth/":
+            return self._send(200, {"token": TOKEN})
+        rows = self.server.data.get(path)
+        if rows is None:
+            return self._send(404, {"detail": "Not found."})
+        with self.server.lock:
+            body["id"] = max((r["id"] for r in rows), default=0) + 1
+            rows.append(body)
+        return self._send(201, body)
+
+    def _get(self):
+        parts = urlsplit(self.path)
+        q = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if (self.headers.get("Authorization") or "") != f"Token {TOKEN}":
+            return self._send(401, {"detail": "Authentication credentials were not provided."})
+        rows = self.server.data.get(parts.path)
+        if rows is None:
+            return self._send(404, {"detail": "Not found."})
+        wanted = [(FILTERS[k], v) for k, v in q.items() if k in FILTERS]
+        if wanted:
+            try:
+                rows = [r for r in rows if all(f(r, v) for f, v in wanted)]
+            except ValueError as e:
+                return self._send(400, {"detail": str(e)})
+        page = max(1, int(q.get("page", 1)))
+        size = min(MAX_PAGE_SIZE, max(1, int(q.get("page_size", DEFAULT_PAGE_SIZE))))
+        chunk = rows[(page - 1) * size: page * size]
+        fields = [f for f in (q.get("fields") or "").split(",") if f]
+        if fields:
+            chunk = [{k: r[k] for k in fields if k in r} for r in chunk]
+        nxt = None
+        if page * size < len(rows):
+            nq = dict(q, page=page + 1)
+            nxt = f"http://{self.headers.get('Host')}{parts.path}?{urlencode(nq)}"
+        return self._send(200, {"count": len(rows), "next": nxt, "previous": None,
+                                "msg": "", "code": 0, "data": chunk})
+
+def start(port=0, latency=0.0, workers=0, **dataset_opts):
+    """Run the stub in a background thread; returns (server, base_url). workers=0: no limit."""
+    srv = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    srv.daemon_threads = True
+    srv.data = build_dataset(**dataset_opts)
+    srv.latency = latency
+    srv.slots = threading.BoundedSemaphore(workers) if workers else nullcontext()
+    srv.lock = threading.Lock()
+    srv.stats = {"requests": 0, "bytes": 0}
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+def reset_stats(srv):
+    with srv.lock:
+        srv.stats = {"requests": 0, "bytes": 0}
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Local ZKBioTime stub server")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--employees", type=int, default=200)
+    ap.add_argument("--days", type=int, default=14)
+    ap.add_argument("--terminals", type=int, default=6)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    ap.add_argument("--workers", type=int, default=0, help="requests served at once (0: no limit)")
+    a = ap.parse_args()
+    srv, url = start(a.port, a.latency, a.workers, employees=a.employees, days=a.days, terminals=a.terminals)
+    print(f"[STUB] Serving {len(srv.data['/iclock/api/transactions/'])} transactions on {url} "
+          f"(user/password: anything, token: {TOKEN})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -2,9 +2,8 @@
 import os, sys, time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import requests
-from config import BASE_URL
-from utils.state import get_auth_headers
+from utils import api, cache, outbox, prefetch, profiling, sites, snapshot
+from ui.common import add_outage_banner, close_window
 
 # ===== THEME =====
 BG = "black"
@@ -99,6 +98,7 @@ def open_add_employee(parent=None):
     win.geometry("620x460")
 
     _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
 
     frm = tk.Frame(win, bg=BG)
     frm.pack(fill="x", padx=12, pady=8)
@@ -122,28 +122,9 @@ def open_add_employee(parent=None):
     dept_dropdown = ttk.Combobox(frm, textvariable=dept_var, state="readonly", width=ENTRY_W-2)
     dept_dropdown.grid(row=2, column=1, sticky="w")
 
-    dept_map = {}
-    try:
-        page = 1
-        while True:
-            resp = requests.get(
-                f"{BASE_URL}/personnel/api/departments/?page={page}",
-                headers=get_auth_headers(), timeout=20
-            )
-            if resp.status_code != 200:
-                break
-            payload = resp.json() or {}
-            data = payload.get("data", [])
-            for dept in data:
-                name = dept.get("dept_name")
-                did  = dept.get("id")
-                if name and did is not None:
-                    dept_map[name] = did
-            if not payload.get("next"):
-                break
-            page += 1
-    except Exception as e:
-        print("[ERROR] Fetching departments:", e)
+    # prefetched after login; else a live load, or the last saved copy when offline
+    dept_map, dept_stale = prefetch.get("departments")
+    dept_map = dept_map or {}
 
     dept_values = sorted(dept_map.keys(), key=lambda s: s.lower())
     dept_dropdown["values"] = dept_values
@@ -157,28 +138,8 @@ def open_add_employee(parent=None):
     pos_dropdown = ttk.Combobox(frm, textvariable=pos_var, width=ENTRY_W-2)  # editable so user can add new
     pos_dropdown.grid(row=3, column=1, sticky="w")
 
-    pos_map = {}
-    try:
-        page = 1
-        while True:
-            resp = requests.get(
-                f"{BASE_URL}/personnel/api/positions/?page={page}",
-                headers=get_auth_headers(), timeout=20
-            )
-            if resp.status_code != 200:
-                break
-            payload = resp.json() or {}
-            data = payload.get("data", [])
-            for pos in data:
-                pname = pos.get("position_name")
-                pid   = pos.get("id")
-                if pname and pid is not None:
-                    pos_map[pname] = pid
-            if not payload.get("next"):
-                break
-            page += 1
-    except Exception as e:
-        print("[ERROR] Fetching positions:", e)
+    pos_map, pos_stale = prefetch.get("positions")
+    pos_map = pos_map or {}
 
     pos_values = sorted(pos_map.keys(), key=lambda s: s.lower())
     pos_dropdown["values"] = pos_values
@@ -190,9 +151,36 @@ def open_add_employee(parent=None):
     L(4,0,"Area")
     tk.Label(frm, text="ALPAGO (Fixed)", fg=FG, bg=BG).grid(row=4, column=1, sticky="w")
 
+    # --- Offline / sync status ---
+    stale = dept_stale if dept_stale is not None else pos_stale
+    if stale is not None:
+        tk.Label(frm, text=snapshot.stale_text(stale) + " (stale)", fg="orange", bg=BG)\
+          .grid(row=5, column=0, columnspan=2, sticky="w", pady=(6, 0))
+    sync_var = tk.StringVar()
+    tk.Label(frm, textvariable=sync_var, fg="#aaa", bg=BG).grid(row=6, column=0, columnspan=2, sticky="w")
+
+    def refresh_sync():
+        if not win.winfo_exists():
+            return
+        if not win.winfo_viewable():  # hidden until reopened from the menu
+            win.after(2000, refresh_sync)
+            return
+        pending, failed = outbox.status()
+        txt = []
+        if outbox.offline_enabled():
+            txt.append("Offline mode: saves are queued locally")
+        if pending:
+            txt.append(f"{pending} waiting to sync")
+        if failed:
+            txt.append(f"{failed} rejected (see outbox_failed.jsonl)")
+        sync_var.set(" | ".join(txt))
+        win.after(2000, refresh_sync)
+    refresh_sync()
+
     # Buttons
     btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=12, pady=10)
 
+    @profiling.profiled("add_employee Submit")
     def submit(event=None):
         emp_code = emp_id_entry.get().strip()
         fname    = fname_entry.get().strip()
@@ -208,13 +196,33 @@ def open_add_employee(parent=None):
         if not pos_name:
             messagebox.showwarning("Input", "Please enter or select a Position."); return
 
-        # Ensure position exists (create if typed new)
+        if outbox.pending_employee(emp_code):
+            messagebox.showwarning("Input", f"Employee {emp_code} is already queued for sync."); return
+
         pos_id = pos_map.get(pos_name)
+        payload = {
+            "emp_code": emp_code,
+            "first_name": fname,
+            "department": dept_id,
+            "position": pos_id,
+            "area": [2]  # Always ALPAGO
+        }
+
+        def queue(reason, uncertain=False):
+            # durable local append; the outbox creates the position (if new) and the employee later
+            outbox.enqueue("employee", dict(payload, position_name=pos_name), uncertain=uncertain)
+            messagebox.showinfo("Queued", f"{reason}\nEmployee saved locally and will be sent automatically.")
+            done()
+
+        if outbox.offline_enabled():
+            queue("Offline mode is on.")
+            return
+
+        # Ensure position exists (create if typed new)
         if not pos_id:
             try:
-                new_pos = requests.post(
-                    f"{BASE_URL}/personnel/api/positions/",
-                    headers=get_auth_headers(), timeout=20,
+                new_pos = api.post(
+                    f"{sites.base_url()}/personnel/api/positions/", timeout=20,
                     json={
                         "position_code": pos_name[:10] or "POS",
                         "position_name": pos_name,
@@ -222,9 +230,12 @@ def open_add_employee(parent=None):
                     }
                 )
                 if new_pos.status_code in (200, 201):
-                    pos_id = (new_pos.json() or {}).get("id")
+                    cache.invalidate(new_pos.url)
+                    prefetch.invalidate("positions")
+                    pos_id = (api.decode(new_pos) or {}).get("id")
                     if pos_id:
                         pos_map[pos_name] = pos_id
+                        payload["position"] = pos_id
                         # re-sort values and keep selection on the new one
                         new_vals = sorted(pos_map.keys(), key=lambda s: s.lower())
                         pos_dropdown["values"] = new_vals
@@ -232,33 +243,37 @@ def open_add_employee(parent=None):
                 else:
                     messagebox.showerror("Position", f"Failed to create position.\n{new_pos.text}")
                     return
+            except api.NETWORK_ERRORS as e:
+                queue(f"Server unreachable ({e.__class__.__name__}).")
+                return
             except Exception as e:
                 messagebox.showerror("Position", f"Error creating position:\n{e}")
                 return
 
-        payload = {
-            "emp_code": emp_code,
-            "first_name": fname,
-            "department": dept_id,
-            "position": pos_id,
-            "area": [2]  # Always ALPAGO
-        }
-
         try:
-            res = requests.post(
-                f"{BASE_URL}/personnel/api/employees/",
-                headers=get_auth_headers(), json=payload, timeout=25
-            )
+            res = api.post(f"{sites.base_url()}/personnel/api/employees/", json=payload, timeout=25)
             if res.status_code in (200, 201):
+                cache.invalidate(res.url)
+                prefetch.invalidate("employees")
                 messagebox.showinfo("Success", "Employee Added Successfully!")
-                win.destroy()
+                done()
             else:
                 messagebox.showerror("Error", f"Failed to add employee.\nHTTP {res.status_code}\n{res.text}")
+        except api.NETWORK_ERRORS as e:
+            # the server may have saved it before the answer was lost; the outbox checks first
+            queue(f"Server unreachable ({e.__class__.__name__}).", uncertain=True)
         except Exception as e:
             messagebox.showerror("Error", f"Request failed:\n{e}")
 
+    def done():
+        # the window is kept for the next employee: clear the per-employee fields
+        emp_id_entry.delete(0, tk.END)
+        fname_entry.delete(0, tk.END)
+        emp_id_entry.focus()
+        close_window(win)
+
     def cancel():
-        win.destroy()
+        close_window(win)
 
     def mkbtn(text, cmd):
         b = tk.Button(btns, text=text, command=cmd, bg=BTN_BG, fg="white",
@@ -274,6 +289,7 @@ def open_add_employee(parent=None):
     win.bind("<Return>", submit)
     win.bind("<Escape>", lambda e: cancel())
     emp_id_entry.focus()
+    return win
 
 # Backwards-compat entry points
 def main(): return open_add_employee()
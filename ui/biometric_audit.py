@@ -0,0 +1,231 @@
+# File: ui/biometric_audit.py
+# Biometric enrollment audit: every employee of the selected sites is checked
+# for a fingerprint / face / palm enrollment in one crawl of
+# /personnel/api/employees/ (big pages, fetched concurrently). Rows are
+# checked as pages arrive and only the per-department totals and the list of
+# unenrolled employees are kept, so memory stays flat for any workforce size.
+import os, sys, csv, queue, threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime
+
+from utils import api, profiling, sites
+from ui.check_employee import BIOMETRIC_FIELDS, has_any_biometric
+from ui.common import add_outage_banner, add_site_picker, close_window
+
+# Optional Excel support (openpyxl)
+try:
+    from openpyxl import Workbook
+    HAVE_XLSX = True
+except Exception:
+    HAVE_XLSX = False
+
+# ===== THEME =====
+BG, FG = "black", "white"
+BTN_BG, BTN_H = "#222", "#333"
+
+AUDIT_FIELDS = "emp_code,first_name,last_name,department,position," + ",".join(BIOMETRIC_FIELDS)
+COVERAGE_HEADER = ["Site", "Department", "Employees", "Enrolled", "Missing", "Coverage %"]
+MISSING_HEADER = ["Site", "Code", "Name", "Department", "Position"]
+
+def _asset_path(*parts):
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base, "assets", *parts)
+
+def _add_header(win, text=""):
+    header = tk.Frame(win, bg=BG)
+    header.pack(fill="x", pady=(3, 5))
+    logo = tk.Label(header, bg=BG)
+    lp = _asset_path("newg.png")
+    if os.path.exists(lp):
+        try:
+            from PIL import Image, ImageTk
+            img = Image.open(lp); img.thumbnail((60, 60))
+            ph = ImageTk.PhotoImage(img)
+            logo.image = ph; logo.config(image=ph)
+        except Exception:
+            try:
+                ph = tk.PhotoImage(file=lp)
+                logo.image = ph; logo.config(image=ph)
+            except Exception:
+                logo.config(text="[LOGO]", fg=FG)
+    else:
+        logo.config(text="[LOGO]", fg=FG)
+    logo.pack(side="left", padx=(5, 8))
+    if text:
+        tk.Label(header, text=text, font=("Segoe UI", 9, "bold"), fg=FG, bg=BG)\
+          .pack(side="left", pady=(15, 0))
+
+# ==== Data ====
+def _name_of(val, key):
+    if isinstance(val, dict):
+        return val.get(key) or "N/A"
+    return val or "N/A"
+
+def audit(site=None, progress=None):
+    """
+    One concurrent scan of a site's employees. Returns
+    {"scanned", "departments": {name: [employees, enrolled]}, "missing": [(code, name, dept, position)]}.
+    progress(scanned) is called after every page.
+    """
+    departments, missing, scanned = {}, [], 0
+    url = f"{sites.base_url(site)}/personnel/api/employees/"
+    for rows in api.iter_pages_parallel(url, {"fields": AUDIT_FIELDS}):
+        for emp in rows:
+            dept = _name_of(emp.get("department"), "dept_name")
+            tally = departments.setdefault(dept, [0, 0])
+            tally[0] += 1
+            if has_any_biometric(emp):
+                tally[1] += 1
+            else:
+                name = f"{emp.get('first_name') or ''} {emp.get('last_name') or ''}".strip()
+                missing.append((str(emp.get("emp_code", "")), name, dept,
+                                _name_of(emp.get("position"), "position_name")))
+        scanned += len(rows)
+        if progress:
+            progress(scanned)
+    missing.sort(key=lambda m: (m[2].lower(), m[0]))
+    return {"scanned": scanned, "departments": departments, "missing": missing}
+
+def coverage_rows(results):
+    """[Site, Department, Employees, Enrolled, Missing, Coverage %] per department, worst first."""
+    out = []
+    for site, res in results.items():
+        for dept, (total, enrolled) in res["departments"].items():
+            out.append([site, dept, total, enrolled, total - enrolled, round(100.0 * enrolled / total, 1)])
+    out.sort(key=lambda r: (r[5], r[0], r[1].lower()))
+    return out
+
+def missing_rows(results):
+    return [[site, *m] for site, res in results.items() for m in res["missing"]]
+
+# ==== UI ====
+def open_biometric_audit(parent=None):
+    win = tk.Toplevel(parent) if parent else tk.Toplevel()
+    win.title("Biometric Audit")
+    win.configure(bg=BG)
+    win.geometry("900x680")
+
+    _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
+    pick_sites = add_site_picker(win, BG, FG)
+
+    status_var = tk.StringVar(value="Press Run Audit to scan every employee.")
+    tk.Label(win, textvariable=status_var, fg=FG, bg=BG, anchor="w").pack(fill="x", padx=10)
+
+    def table(cols, widths, height):
+        tv = ttk.Treeview(win, columns=cols, show="headings", height=height)
+        for c, w in zip(cols, widths):
+            tv.heading(c, text=c)
+            tv.column(c, width=w, anchor="w")
+        tv.pack(fill="both", expand=True, padx=10, pady=6)
+        return tv
+
+    cov_tree = table(COVERAGE_HEADER, (90, 220, 90, 90, 90, 90), 9)
+    miss_tree = table(MISSING_HEADER, (90, 90, 220, 200, 180), 12)
+
+    store = {"results": None, "running": False}
+    inbox = queue.Queue()   # worker -> UI thread: ("progress", text) / ("done", results, errors)
+
+    def worker(picked):
+        scanned = {}
+
+        def progress_for(site):
+            def report(n):
+                scanned[site] = n
+                inbox.put(("progress", f"Scanning… {sum(scanned.values())} employees checked", None))
+            return report
+
+        results = api.fan_out(lambda site: audit(site, progress_for(site)), picked)
+        done = {site: res for site, (res, err) in results.items() if err is None}
+        errors = [f"{site}: {err}" for site, (_, err) in results.items() if err is not None]
+        inbox.put(("done", done, errors))
+
+    @profiling.profiled("biometric_audit Run")
+    def run_audit():
+        if store["running"]:
+            return
+        picked = pick_sites()
+        if not picked:
+            messagebox.showwarning("Sites", "Tick at least one site."); return
+        store["running"] = True
+        status_var.set("Scanning…")
+        threading.Thread(target=worker, args=(picked,), name="biometric-audit", daemon=True).start()
+
+    def show(results, errors):
+        cov_tree.delete(*cov_tree.get_children())
+        miss_tree.delete(*miss_tree.get_children())
+        for r in coverage_rows(results):
+            cov_tree.insert("", "end", values=r)
+        for r in missing_rows(results):
+            miss_tree.insert("", "end", values=r)
+        total = sum(t for res in results.values() for t, _ in res["departments"].values())
+        missing = sum(len(res["missing"]) for res in results.values())
+        text = (f"{total} employees, {total - missing} enrolled, {missing} without biometrics "
+                f"({100.0 * (total - missing) / total if total else 0:.1f}% coverage) | "
+                f"{datetime.now():%H:%M:%S}")
+        if errors:
+            text += " | failed: " + "; ".join(errors)
+        status_var.set(text)
+
+    def pump():
+        if not win.winfo_exists():
+            return
+        try:
+            while True:
+                kind, payload, errors = inbox.get_nowait()
+                if kind == "progress":
+                    status_var.set(payload)
+                else:
+                    store["results"], store["running"] = payload, False
+                    show(payload, errors)
+        except queue.Empty:
+            pass
+        win.after(200, pump)
+
+    @profiling.profiled("biometric_audit Export")
+    def do_export():
+        if not store["results"]:
+            messagebox.showinfo("Nothing to Export", "Run the audit first.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx" if HAVE_XLSX else ".csv",
+            filetypes=[("Excel Workbook", "*.xlsx"), ("CSV", "*.csv"), ("All Files", "*.*")],
+            title="Save Biometric Audit"
+        )
+        if not path: return
+        cov, miss = coverage_rows(store["results"]), missing_rows(store["results"])
+        try:
+            if path.lower().endswith(".xlsx") and HAVE_XLSX:
+                wb = Workbook()
+                ws = wb.active; ws.title = "Coverage"
+                ws.append(COVERAGE_HEADER)
+                for r in cov: ws.append(r)
+                ws = wb.create_sheet("Unenrolled")
+                ws.append(MISSING_HEADER)
+                for r in miss: ws.append(r)
+                wb.save(path)
+                saved = path
+            else:
+                # CSV holds one table: unenrolled here, coverage next to it
+                root, ext = os.path.splitext(path)
+                cov_path = f"{root}_coverage{ext or '.csv'}"
+                for p, header, rows in ((path, MISSING_HEADER, miss), (cov_path, COVERAGE_HEADER, cov)):
+                    with open(p, "w", newline="", encoding="utf-8") as f:
+                        w = csv.writer(f); w.writerow(header); w.writerows(rows)
+                saved = f"{path}\n{cov_path}"
+            messagebox.showinfo("Exported", f"Saved to:\n{saved}")
+        except Exception as e:
+            messagebox.showerror("Export Failed", f"Could not save file.\n\n{e}")
+
+    btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=10, pady=(0, 8))
+    for text, cmd in (("Run Audit", run_audit), ("Export to Excel", do_export), ("Close", lambda: close_window(win))):
+        tk.Button(btns, text=text, command=cmd, bg=BTN_BG, fg="white",
+                  activebackground=BTN_H, activeforeground="white",
+                  padx=14, pady=8, relief="flat", cursor="hand2").pack(side="left", padx=(0, 8))
+
+    pump()
+    return win
+
+def main(): return open_biometric_audit()
+def run():  return open_biometric_audit()
@@ -2,9 +2,8 @@
 import os, sys
 import tkinter as tk
 from tkinter import messagebox
-import requests
-from config import BASE_URL
-from utils.state import get_auth_headers
+from utils import api, outbox, prefetch, profiling, sites, snapshot
+from ui.common import add_outage_banner, add_site_picker, close_window
 
 # ===== THEME =====
 BG = "black"
@@ -48,6 +47,32 @@ def _add_header(win, text=""):
         tk.Label(header, text=text, font=("Segoe UI", 9, "bold"), fg=FG, bg=BG)\
           .pack(side="left", pady=(15, 0))
 
+BIOMETRIC_FIELDS = ('fingerprint', 'face', 'palm', 'vl_face')
+
+def has_any_biometric(emp):
+    for field in BIOMETRIC_FIELDS:
+        val = emp.get(field)
+        if isinstance(val, str):
+            v = val.strip().lower()
+            if v and v != "-":
+                return True
+        elif val:  # truthy non-string
+            return True
+    return False
+
+def lookup_employee(emp_code, site=None, fresh=False):
+    """
+    Employee records the server returns for emp_code on a site (primary by
+    default). fresh=True skips the response cache (just-enrolled biometrics).
+    """
+    resp = api.get(f"{sites.base_url(site)}/personnel/api/employees/",
+                   params={"emp_code": emp_code}, timeout=20, fresh=fresh)
+    print("[DEBUG] Response:", resp.status_code)
+    if resp.status_code != 200:
+        raise api.ApiError(resp.status_code, resp.text[:200])
+    payload = api.decode(resp)
+    return payload.get("data", []) if isinstance(payload, dict) else []
+
 def open_check_employee(parent=None):
     win = tk.Toplevel(parent) if parent else tk.Toplevel()
     win.title("Check Employee Biometric")
@@ -55,6 +80,7 @@ def open_check_employee(parent=None):
     win.geometry("520x420")
 
     _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
 
     # --- Input area ---
     frm = tk.Frame(win, bg=BG)
@@ -65,6 +91,8 @@ def open_check_employee(parent=None):
     code_entry = tk.Entry(frm, textvariable=code_var, bg=INPUT_BG, fg=FG, insertbackground=FG, width=24, relief="flat")
     code_entry.grid(row=0, column=1, sticky="w", padx=(6, 0))
 
+    pick_sites = add_site_picker(win, BG, FG)
+
     # --- Buttons ---
     btns = tk.Frame(win, bg=BG)
     btns.pack(fill="x", padx=10, pady=6)
@@ -90,17 +118,58 @@ def open_check_employee(parent=None):
         except Exception as e:
             print("[WARN] Could not write log.txt:", e)
 
-    def _has_any_biometric(emp):
-        # same fields you used
-        for field in ['fingerprint', 'face', 'palm', 'vl_face']:
-            val = emp.get(field)
-            if isinstance(val, str):
-                v = val.strip().lower()
-                if v and v != "-":
-                    return True
-            elif val:  # truthy non-string
-                return True
-        return False
+    # last looked-up record per code, served (marked stale) when the server is unreachable
+    def _remember(emp):
+        seen, _ = snapshot.load("employees")
+        seen = seen or {}
+        seen[str(emp.get("emp_code", ""))] = emp
+        snapshot.save("employees", seen)
+
+    def _recall(code):
+        seen, saved_at = snapshot.load("employees")
+        emp = (seen or {}).get(code)
+        return emp, (saved_at if emp else None)
+
+    def _queued_text(entry):
+        p = entry["payload"]
+        return (
+            f"Code: {p.get('emp_code','')}\n"
+            f"Name: {p.get('first_name','')}\n"
+            f"Position: {p.get('position_name') or 'N/A'}\n\n"
+            f"Status: queued {entry.get('queued_at','')}, not yet on the server\n"
+        )
+
+    def _describe(emp):
+        biometric_result = "✅" if has_any_biometric(emp) else "❌"
+
+        dept_name = "N/A"
+        dept = emp.get('department')
+        if isinstance(dept, dict):
+            dept_name = dept.get('dept_name', 'N/A')
+        elif isinstance(dept, str):
+            dept_name = dept
+
+        pos_val = emp.get('position')
+        if isinstance(pos_val, dict):
+            pos_name = pos_val.get('position_name')
+        else:
+            pos_name = pos_val
+
+        areas = emp.get('area') or []
+        try:
+            area_text = ", ".join([a.get('area_name','') for a in areas if isinstance(a, dict)]) or "N/A"
+        except Exception:
+            area_text = "N/A"
+
+        return (
+            f"ID: {emp.get('id','')}\n"
+            f"Code: {emp.get('emp_code','')}\n"
+            f"Name: {(emp.get('first_name','') or '')} {(emp.get('last_name','') or '')}\n"
+            f"Department: {dept_name}\n"
+            f"Position: {pos_name or 'N/A'}\n"
+            f"Area(s): {area_text}\n\n"
+            f"BioMetrics: {biometric_result}\n"
+        )
 
     def _set_text(s):
         result_box.config(state='normal')
@@ -108,76 +177,88 @@ def open_check_employee(parent=None):
         result_box.insert(tk.END, s)
         result_box.config(state='disabled')
 
+    def _check_sites(emp_code, picked):
+        """Same lookup on every picked site at once; one section per site."""
+        parts, found = [], False
+        for site, (data, err) in api.fan_out(lambda site: lookup_employee(emp_code, site, fresh=True),
+                                             picked).items():
+            if err is not None:
+                parts.append(f"[{site}] error: {err}\n")
+            elif not data:
+                parts.append(f"[{site}] not found\n")
+            else:
+                found = True
+                parts.append(f"[{site}]\n" + _describe(data[0]))
+        if not found:
+            _log_missing(emp_code)
+        _set_text("\n".join(parts))
+
+    @profiling.profiled("check_employee Check")
     def check(event=None):
         emp_code = code_var.get().strip()
         if not emp_code:
             messagebox.showwarning("Input Error", "Please enter an employee code.")
             return
+        picked = pick_sites()
+        if not picked:
+            messagebox.showwarning("Sites", "Tick at least one site."); return
+        if picked != [sites.primary()]:
+            return _check_sites(emp_code, picked)
 
-        url = f"{BASE_URL}/personnel/api/employees/"
-        headers = get_auth_headers()
-        params = {"emp_code": emp_code}
         print("[DEBUG] Checking employee with code:", emp_code)
 
+        stale, note = None, ""
+        # the prefetched record (up to minutes old) is only painted while the
+        # server is asked: biometrics are checked right after enrolling
+        early = (prefetch.peek("employees") or {}).get(emp_code)
+        if early is not None:
+            _set_text(_describe(early) + "\n(checking the server…)\n")
+            win.update_idletasks()
         try:
-            resp = requests.get(url, headers=headers, params=params, timeout=20)
-            print("[DEBUG] Response:", resp.status_code)
-            if resp.status_code != 200:
-                try:
-                    txt = resp.text
-                except Exception:
-                    txt = ""
-                messagebox.showerror("Server Error", f"HTTP {resp.status_code}\n{txt}")
+            try:
+                data = lookup_employee(emp_code, fresh=True)
+            except api.ApiError as e:
+                _set_text("")  # drop the prefetched record painted above
+                messagebox.showerror("Server Error", f"HTTP {e.status}\n{e.text}")
                 return
-
-            payload = resp.json() if resp.content else {}
-            data = payload.get("data", []) if isinstance(payload, dict) else []
             if not data:
+                queued = outbox.pending_employee(emp_code)
+                if queued:
+                    _set_text(_queued_text(queued)); return
+                _set_text("")
                 messagebox.showinfo("Not Found", "No employee found with this code.")
                 _log_missing(emp_code)
                 return
 
             emp = data[0]  # keep same behavior
-            biometric_result = "✅" if _has_any_biometric(emp) else "❌"
-
-            dept_name = "N/A"
-            dept = emp.get('department')
-            if isinstance(dept, dict):
-                dept_name = dept.get('dept_name', 'N/A')
-            elif isinstance(dept, str):
-                dept_name = dept
-
-            pos_val = emp.get('position')
-            if isinstance(pos_val, dict):
-                pos_name = pos_val.get('position_name')
-            else:
-                pos_name = pos_val
-
-            areas = emp.get('area') or []
-            try:
-                area_text = ", ".join([a.get('area_name','') for a in areas if isinstance(a, dict)]) or "N/A"
-            except Exception:
-                area_text = "N/A"
-
-            info = (
-                f"ID: {emp.get('id','')}\n"
-                f"Code: {emp.get('emp_code','')}\n"
-                f"Name: {(emp.get('first_name','') or '')} {(emp.get('last_name','') or '')}\n"
-                f"Department: {dept_name}\n"
-                f"Position: {pos_name or 'N/A'}\n"
-                f"Area(s): {area_text}\n\n"
-                f"BioMetrics: {biometric_result}\n"
-            )
-
-            _set_text(info)
+            _remember(emp)
 
+        except api.NETWORK_ERRORS as e:
+            print("[WARN] Server unreachable, trying saved copy:", e)
+            emp, stale = _recall(emp_code)
+            if emp is None and early is not None:
+                emp, note = early, "\nPrefetched copy; the server is unreachable.\n"
+            if emp is None:
+                queued = outbox.pending_employee(emp_code)
+                if queued:
+                    _set_text(_queued_text(queued)); return
+                messagebox.showerror("Offline", f"Server unreachable and no saved copy of {emp_code}.\n\n{e}")
+                return
         except Exception as e:
             print("[EXCEPTION] Failed to check employee:", e)
             messagebox.showerror("Error", str(e))
+            return
+
+        info = _describe(emp) + note
+        if stale is not None:
+            info += f"\n{snapshot.stale_text(stale)} (stale)\n"
+
+        _set_text(info)
 
     mkbtn("Check", check)
-    mkbtn("Close", win.destroy)
+    mkbtn("Close", lambda: close_window(win))
 
     # Enter to submit
     win.bind("<Return>", check)
     code_entry.focus()
+    return win
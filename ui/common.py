@@ -0,0 +1,72 @@
+# File: ui/common.py
+# Small widgets shared by the module windows.
+import tkinter as tk
+
+from utils import breaker, sites
+
+BANNER_REFRESH_MS = 1000
+
+def add_site_picker(parent, bg="black", fg="white"):
+    """
+    One checkbox per configured ZKBioTime site (nothing is shown for a single site).
+    Returns a function giving the ticked site names; the choice is remembered.
+    """
+    if not sites.is_multi():
+        return sites.selected
+    row = tk.Frame(parent, bg=bg)
+    row.pack(fill="x", padx=10, pady=(0, 4))
+    tk.Label(row, text="Sites:", fg=fg, bg=bg).pack(side="left")
+    chosen = set(sites.selected())
+    flags = {}
+
+    def picked():
+        return [n for n, v in flags.items() if v.get()]
+
+    for name in sites.names():
+        flags[name] = tk.BooleanVar(value=name in chosen)
+        tk.Checkbutton(row, text=name, variable=flags[name], command=lambda: sites.set_selected(picked()),
+                       fg=fg, bg=bg, activeforeground=fg, activebackground=bg, selectcolor=bg)\
+          .pack(side="left", padx=4)
+    return picked
+
+def close_window(win):
+    """Close like the title-bar X: the menu keeps (hides) its windows, a standalone one is destroyed."""
+    handler = win.protocol("WM_DELETE_WINDOW")
+    if handler:
+        win.tk.call(handler)
+    else:
+        win.destroy()
+
+def add_outage_banner(parent, bg="black"):
+    """
+    Red strip that appears while a server's circuit breaker is open (calls to it
+    fail immediately) and disappears once it recovers.
+    """
+    holder = tk.Frame(parent, bg=bg)  # stays packed so the strip keeps its place
+    holder.pack(fill="x", padx=10)
+    label = tk.Label(holder, fg="white", bg="#8b0000", anchor="w", justify="left",
+                     padx=8, pady=4, font=("Segoe UI", 9, "bold"))
+
+    def refresh():
+        try:
+            if not holder.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        if not holder.winfo_viewable():  # window hidden: nothing to show
+            holder.after(BANNER_REFRESH_MS, refresh)
+            return
+        lines = []
+        for host, (state, wait, reason) in breaker.status().items():
+            name = sites.for_url(f"//{host}")
+            when = "checking now…" if state == breaker.HALF_OPEN else f"next check in {wait:.0f}s"
+            lines.append(f"⚠ {name} server unreachable ({reason}) - requests fail immediately; {when}")
+        if lines:
+            label.config(text="\n".join(lines))
+            if not label.winfo_ismapped():
+                label.pack(fill="x", pady=(0, 4))
+        else:
+            label.pack_forget()
+        holder.after(BANNER_REFRESH_MS, refresh)
+
+    refresh()
@@ -0,0 +1,258 @@
+# File: ui/department_report.py
+# Attendance totals per department for a date window, rolled up the
+# department tree: picking a division includes every department below it,
+# and each row shows its own employees plus all of its descendants'.
+# Departments and the employee directory come from the prefetch; the
+# window's punches are read once (or found in the local store), so the
+# whole tree costs no more queries than a single department. Servers that
+# give no page count to read the window by get one id-filtered read per
+# employee instead, with every id resolved in one directory scan. Days flagged
+# by the anomaly rules come with the stored summaries, so counting them
+# costs no second scan. With SHIFTS configured both paths count shift days.
+import os, sys, csv
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from tkcalendar import DateEntry
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import departments, employee_ids, prefetch, profiling, rollups, shifts, sites, snapshot
+from ui.common import add_outage_banner, close_window
+from ui.employee_attendance import load_window, _filtered_fetch, _filter_and_group
+
+# Optional Excel support (openpyxl)
+try:
+    from openpyxl import Workbook
+    HAVE_XLSX = True
+except Exception:
+    HAVE_XLSX = False
+
+# ===== THEME =====
+BG, FG = "black", "white"
+BTN_BG, BTN_H = "#222", "#333"
+
+PER_EMPLOYEE_WORKERS = 8   # parallel reads in the per-employee fallback (the governor still caps them)
+
+HEADER = ["Department", "Employees", "Present days", "Attendance %", "Punches", "Hours", "Flagged days"]
+
+def _asset_path(*parts):
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base, "assets", *parts)
+
+def _add_header(win, text=""):
+    header = tk.Frame(win, bg=BG)
+    header.pack(fill="x", pady=(3, 5))
+    logo = tk.Label(header, bg=BG)
+    lp = _asset_path("newg.png")
+    if os.path.exists(lp):
+        try:
+            from PIL import Image, ImageTk
+            img = Image.open(lp); img.thumbnail((60, 60))
+            ph = ImageTk.PhotoImage(img)
+            logo.image = ph; logo.config(image=ph)
+        except Exception:
+            try:
+                ph = tk.PhotoImage(file=lp)
+                logo.image = ph; logo.config(image=ph)
+            except Exception:
+                logo.config(text="[LOGO]", fg=FG)
+    else:
+        logo.config(text="[LOGO]", fg=FG)
+    logo.pack(side="left", padx=(5, 8))
+    if text:
+        tk.Label(header, text=text, font=("Segoe UI", 9, "bold"), fg=FG, bg=BG)\
+          .pack(side="left", pady=(15, 0))
+
+# ==== Data ====
+def _minutes(slot):
+    if "worked" in slot:  # shift days (a night shift's last punch is "06:00+1")
+        return slot["worked"]
+    try:
+        a = datetime.strptime(slot["first"], "%H:%M")
+        b = datetime.strptime(slot["last"], "%H:%M")
+    except (TypeError, ValueError):
+        return 0
+    return max(0, int((b - a).total_seconds() // 60))
+
+def _by_employee(codes, start_date, end_date):
+    """
+    {emp_code: {day: slot}} from one id-filtered read per employee, for servers
+    without a page count. The ids come from one paged scan (employee_ids.resolve_many).
+    """
+    key = sites.base_url()
+    url = f"{key}/iclock/api/transactions/"
+    lo, hi = shifts.fetch_window(start_date, end_date)
+    ids = employee_ids.resolve_many(codes)
+
+    def one(code):
+        if code not in ids:
+            return {}
+        rows = _filtered_fetch(url, {"emp": ids[code], "start_time": f"{lo} 00:00:00",
+                                     "end_time": f"{hi} 23:59:59"}, code)
+        if rows is None:
+            raise RuntimeError("The server gives no page count and ignores the employee filter; "
+                               "try a shorter window.")
+        rollups.ingest(key, rows)
+        if shifts.enabled():
+            return shifts.summarise(rows, code, start_date, end_date)
+        return _filter_and_group(rows, code, start_date, end_date)
+
+    with ThreadPoolExecutor(max_workers=PER_EMPLOYEE_WORKERS) as pool:
+        return dict(zip(codes, pool.map(one, codes)))
+
+def department_report(tree, dept_id, start_date, end_date):
+    """
+    Totals for a department and everything below it (primary site):
+    {"depts": [ids, preorder], "totals": {id: [employees, present days, punches, minutes, flagged days]},
+    "days": n}.
+    Each department's totals include all its descendants.
+    """
+    root = departments.find(tree, dept_id)
+    if root is None:
+        raise ValueError(f"Unknown department {dept_id}")
+    lo, hi = tree["tin"][root], tree["tout"][root]
+
+    # employees of the subtree: one interval check each, no per-department queries
+    directory, _ = prefetch.get("employees")
+    dept_of = {}
+    for code, emp in (directory or {}).items():
+        dept = emp.get("department")
+        d = departments.find(tree, dept.get("id") if isinstance(dept, dict) else dept)
+        if d is not None and lo <= tree["tin"][d] <= hi:
+            dept_of[code] = d
+
+    key = sites.base_url()
+    first, last = shifts.fetch_window(start_date, end_date)
+    if load_window(first, last):
+        if shifts.enabled():  # shift days, as on the per-employee path
+            days = {code: shifts.summarise(rollups.employee_punches(key, code, first, last),
+                                           code, start_date, end_date) for code in dept_of}
+        else:
+            days = rollups.employees(key, list(dept_of), start_date, end_date)
+    else:
+        days = _by_employee(list(dept_of), start_date, end_date)
+
+    own = {}
+    for code, d in dept_of.items():
+        t = own.setdefault(d, [0, 0, 0, 0, 0])
+        t[0] += 1
+        for slot in days.get(code, {}).values():
+            if slot["punches"]:
+                t[1] += 1
+                t[2] += slot["punches"]
+                t[3] += _minutes(slot)
+            if slot.get("flags"):
+                t[4] += 1
+    totals = departments.rollup(tree, own, 5)
+    n_days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days + 1
+    return {"depts": departments.subtree(tree, root), "totals": totals, "days": n_days}
+
+def report_rows(tree, report):
+    """Export/display rows in tree order: [indented name, employees, present, rate %, punches, hours, flagged]."""
+    out = []
+    for d in report["depts"]:
+        emps, present, punches, minutes, flagged = report["totals"][d]
+        rate = round(100.0 * present / (emps * report["days"]), 1) if emps else 0.0
+        out.append([departments.label(tree, d), emps, present, rate, punches, round(minutes / 60.0, 1), flagged])
+    return out
+
+# ==== UI ====
+def open_department_report(parent=None):
+    win = tk.Toplevel(parent) if parent else tk.Toplevel()
+    win.title("Department Report")
+    win.configure(bg=BG)
+    win.geometry("860x640")
+
+    _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
+
+    tree, stale = departments.load()
+    by_label = {}
+    for d in tree["order"]:
+        lbl = departments.label(tree, d)
+        by_label[lbl if lbl not in by_label else f"{lbl}  (#{d})"] = d  # same name twice
+    labels = list(by_label)
+
+    form = tk.Frame(win, bg=BG); form.pack(fill="x", padx=10, pady=6)
+    tk.Label(form, text="Department:", fg=FG, bg=BG).grid(row=0, column=0, sticky="w", pady=2)
+    dept_var = tk.StringVar()
+    dept_box = ttk.Combobox(form, textvariable=dept_var, state="readonly", values=labels, width=40)
+    dept_box.grid(row=0, column=1, columnspan=3, sticky="w", padx=(6, 0))
+    if labels:
+        dept_box.current(0)
+
+    tk.Label(form, text="From:", fg=FG, bg=BG).grid(row=1, column=0, sticky="w", pady=2)
+    from_entry = DateEntry(form, date_pattern='yyyy-mm-dd'); from_entry.grid(row=1, column=1, sticky="w", padx=(6, 18))
+    tk.Label(form, text="To:", fg=FG, bg=BG).grid(row=1, column=2, sticky="w", pady=2)
+    to_entry = DateEntry(form, date_pattern='yyyy-mm-dd'); to_entry.grid(row=1, column=3, sticky="w", padx=(6, 0))
+
+    status_var = tk.StringVar(value=(snapshot.stale_text(stale) + " (stale departments)") if stale is not None
+                              else "Totals include every department below the one picked.")
+    tk.Label(win, textvariable=status_var, fg="#aaa", bg=BG, anchor="w").pack(fill="x", padx=10)
+
+    btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=10, pady=6)
+
+    result_tree = ttk.Treeview(win, columns=HEADER[1:], show="tree headings", height=22)
+    result_tree.heading("#0", text=HEADER[0], anchor="w")
+    result_tree.column("#0", width=300)
+    for c in HEADER[1:]:
+        result_tree.heading(c, text=c, anchor="w")
+        result_tree.column(c, width=100, anchor="w")
+    result_tree.pack(padx=10, pady=(6, 10), fill="both", expand=True)
+
+    store = {"rows": []}  # for export
+
+    @profiling.profiled("department_report Run")
+    def do_run():
+        root = by_label.get(dept_var.get())
+        if root is None:
+            messagebox.showwarning("Department", "Pick a department."); return
+        s = from_entry.get_date().strftime("%Y-%m-%d")
+        e = to_entry.get_date().strftime("%Y-%m-%d")
+        if e < s:
+            messagebox.showwarning("Date Range", "End date must be on or after the start date."); return
+        try:
+            report = department_report(tree, root, s, e)
+        except Exception as ex:
+            messagebox.showerror("Report Failed", str(ex)); return
+        rows = report_rows(tree, report)
+        result_tree.delete(*result_tree.get_children())
+        for d, r in zip(report["depts"], rows):
+            up = tree["parent"][d] if d != root else None
+            result_tree.insert("" if up is None else str(up), "end", iid=str(d), text=r[0].strip(),
+                               values=r[1:], open=tree["depth"][d] <= tree["depth"][root] + 1)
+        store["rows"] = rows
+        status_var.set(f"{len(rows)} departments, {rows[0][1] if rows else 0} employees, "
+                       f"{rows[0][6] if rows else 0} flagged days, {s} to {e}")
+
+    @profiling.profiled("department_report Export")
+    def do_export():
+        if not store["rows"]:
+            messagebox.showinfo("Nothing to Export", "Run the report first."); return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx" if HAVE_XLSX else ".csv",
+            filetypes=[("Excel Workbook", "*.xlsx"), ("CSV", "*.csv"), ("All Files", "*.*")],
+            title="Save Department Report"
+        )
+        if not path: return
+        try:
+            if path.lower().endswith(".xlsx") and HAVE_XLSX:
+                wb = Workbook(); ws = wb.active; ws.title = "Departments"
+                ws.append(HEADER)
+                for r in store["rows"]: ws.append(r)
+                wb.save(path)
+            else:
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    w = csv.writer(f); w.writerow(HEADER); w.writerows(store["rows"])
+            messagebox.showinfo("Exported", f"Saved to:\n{path}")
+        except Exception as ex:
+            messagebox.showerror("Export Failed", f"Could not save file.\n\n{ex}")
+
+    for text, cmd in (("Run", do_run), ("Export to Excel", do_export), ("Close", lambda: close_window(win))):
+        tk.Button(btns, text=text, command=cmd, bg=BTN_BG, fg="white",
+                  activebackground=BTN_H, activeforeground="white",
+                  padx=14, pady=8, relief="flat", cursor="hand2").pack(side="left", padx=(0, 8))
+    return win
+
+def main(): return open_department_report()
+def run():  return open_department_report()
@@ -0,0 +1,114 @@
+# File: ui/diagnostics.py
+# Read-only view of the client's network state: circuit breakers, the
+# concurrency governor's current limit and queue, the GET response cache,
+# the offline outbox, the prefetch cache and the local daily summary.
+# Refreshes every second; never calls the server.
+import os, sys
+import tkinter as tk
+
+from utils import breaker, cache, governor, outbox, prefetch, rollups
+from ui.common import close_window
+
+# ===== THEME =====
+BG, FG = "black", "white"
+BTN_BG, BTN_H = "#222", "#333"
+
+REFRESH_MS = 1000
+
+def _asset_path(*parts):
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base, "assets", *parts)
+
+def _add_header(win, text=""):
+    header = tk.Frame(win, bg=BG)
+    header.pack(fill="x", pady=(3, 5))
+    logo = tk.Label(header, bg=BG)
+    lp = _asset_path("newg.png")
+    if os.path.exists(lp):
+        try:
+            from PIL import Image, ImageTk
+            img = Image.open(lp); img.thumbnail((60, 60))
+            ph = ImageTk.PhotoImage(img)
+            logo.image = ph; logo.config(image=ph)
+        except Exception:
+            try:
+                ph = tk.PhotoImage(file=lp)
+                logo.image = ph; logo.config(image=ph)
+            except Exception:
+                logo.config(text="[LOGO]", fg=FG)
+    else:
+        logo.config(text="[LOGO]", fg=FG)
+    logo.pack(side="left", padx=(5, 8))
+    if text:
+        tk.Label(header, text=text, font=("Segoe UI", 9, "bold"), fg=FG, bg=BG)\
+          .pack(side="left", pady=(15, 0))
+
+def report():
+    """Plain-text snapshot of the diagnostics shown in the window."""
+    g = governor.stats()
+    waiting = ", ".join(f"{k} {v}" for k, v in sorted(g["waiting"].items())) or "none"
+    down = breaker.status()
+    lines = ["== Servers =="]
+    lines += [f"{host}: {state}, next probe in {wait:.0f}s ({reason})"
+              for host, (state, wait, reason) in sorted(down.items())] or ["all reachable"]
+    lines += [
+        "",
+        "== Request governor ==",
+        f"Concurrency limit : {g['limit']} (AIMD {g['limit_exact']}, "
+        f"range {governor.LIMIT_MIN}-{governor.LIMIT_MAX})",
+        f"In flight         : {g['in_flight']}",
+        f"Waiting           : {waiting}",
+        f"Answers           : {g['ok']} ok, {g['overload']} overloaded, {g['errors']} failed",
+        f"Limit halved      : {g['decreases']}x" + (f" (last: {g['last_reason']})" if g["last_reason"] else ""),
+    ]
+    for ep, best in sorted(g["baseline"].items()):
+        lines.append(f"  best latency {ep}: {best * 1000:.0f} ms")
+    c = cache.stats()
+    lines += ["", "== Response cache ==",
+              f"Entries: {c['entries']} ({c['bytes'] / 1024:.0f} KiB of {cache.MAX_BYTES // 1024 // 1024} MiB)",
+              f"Hits: {c['hits']}   Misses: {c['misses']}   Joined in-flight: {c['shared']}   Evicted: {c['evicted']}"]
+    pending, failed = outbox.status()
+    lines += ["", "== Offline outbox ==", f"Pending: {pending}   Failed: {failed}",
+              "", "== Prefetch cache =="]
+    for name in prefetch.LOADERS:
+        lines.append(f"{name:12}: {'ready' if prefetch.peek(name) is not None else '-'}")
+    r = rollups.stats()
+    lines += ["", "== Daily summary ==",
+              f"Punches: {r['punches']}   Employee-days: {r['daily']}   Days complete: {r['covered']}"]
+    return "\n".join(lines)
+
+def open_diagnostics(parent=None):
+    win = tk.Toplevel(parent) if parent else tk.Toplevel()
+    win.title("Diagnostics")
+    win.configure(bg=BG)
+    win.geometry("620x460")
+
+    _add_header(win, "")  # logo only
+
+    text = tk.Text(win, bg="#111", fg=FG, font=("Consolas", 10), relief="flat", height=22)
+    text.pack(fill="both", expand=True, padx=10, pady=6)
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        if not win.winfo_viewable():  # hidden until reopened from the menu
+            win.after(REFRESH_MS, refresh)
+            return
+        try:
+            body = report()
+        except Exception as e:
+            body = f"Diagnostics failed: {e}"
+        text.config(state="normal")
+        text.delete("1.0", "end")
+        text.insert("1.0", body)
+        text.config(state="disabled")
+        win.after(REFRESH_MS, refresh)
+
+    tk.Button(win, text="Close", command=lambda: close_window(win), bg=BTN_BG, fg="white",
+              activebackground=BTN_H, activeforeground="white",
+              padx=14, pady=8, relief="flat", cursor="hand2").pack(anchor="w", padx=10, pady=(0, 8))
+    refresh()
+    return win
+
+def main(): return open_diagnostics()
+def run():  return open_diagnostics()
@@ -3,10 +3,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
 from datetime import datetime, timedelta
-import requests
 
-from config import BASE_URL
-from utils.state import get_auth_headers
+from utils import aggregate, anomalies, api, columnar, employee_ids, prefetch, profiling, rollups, shifts, sites
+from utils.appdata import load_json, save_json
+from ui.common import add_outage_banner, add_site_picker, close_window
 
 # Optional Excel support (openpyxl)
 try:
@@ -67,89 +67,272 @@ def _to_hhmm(ts):
     except: return None
 
 def _paginate(url, params=None):
-    """Follow ?next pagination and collect transactions."""
-    headers = get_auth_headers()
-    items, next_url = [], url
-    try:
-        while next_url:
-            r = requests.get(next_url, headers=headers,
-                             params=(params if ('?' not in next_url) else None),
-                             timeout=25)
-            if r.status_code != 200:
-                break
-            payload = r.json() or {}
-            chunk = payload.get("data") or payload.get("results")
-            if isinstance(chunk, list):
-                items.extend(chunk)
-            elif isinstance(payload, list):
-                items.extend(payload)
-                break
-            next_url = payload.get("next")
-    except Exception as e:
-        print("[ERROR] pagination:", e)
+    """Follow ?next pagination and collect transactions (big pages, gzip, fast JSON)."""
+    return api.paginate(url, params=params)
+
+def _filtered_fetch(url, params, emp_code):
+    """
+    All pages for params, or None when page 1 shows the server ignored the
+    employee filter (rows for other codes) - no point crawling everything.
+    """
+    want = str(emp_code).strip()
+    items = []
+    for n, rows in enumerate(api.iter_pages(url, params)):
+        if n == 0 and any(str(r.get("emp_code", "")).strip() != want for r in rows):
+            print(f"[INFO] Server ignored filter {sorted(params)}")
+            return None
+        items.extend(rows)
+    return items
+
+def _stamp(r):
+    return str(r.get("punch_time") or r.get("upload_time") or "")[:19].replace("T", " ")
+
+BISECT_SLACK_PAGES = 1  # also read one page before the window (punches uploaded slightly out of order)
+
+def _bisect_window(url, start_date, end_date):
+    """
+    Unfiltered transaction list, but paged in a stable time order: bisect on page
+    numbers using the first/last punch_time of sampled pages, then read only the
+    pages overlapping [start, end], stopping once past the end.
+    O(log pages + relevant pages) instead of a full crawl. None if the server
+    gives no total count to compute the page range from.
+    """
+    rows1, count, has_next = api.fetch_page(url, 1)
+    if not has_next:
+        return rows1
+    if not count or not rows1:
+        return None
+    size = len(rows1)
+    pages = -(-int(count) // size)
+    cache = {1: rows1}
+
+    def page(n):
+        if n not in cache:
+            cache[n] = api.fetch_page(url, n, {"page_size": size})[0]
+        return cache[n]
+
+    lo, hi = f"{start_date} 00:00:00", f"{end_date} 23:59:59"
+    last = page(pages)
+    desc = bool(last) and _stamp(rows1[0]) > _stamp(last[-1])
+
+    def span(n):
+        stamps = [t for t in map(_stamp, page(n)) if t]
+        return (min(stamps), max(stamps)) if stamps else None
+
+    def reached(n):  # False ... False True ... True over page numbers
+        sp = span(n)
+        return bool(sp) and (sp[0] <= hi if desc else sp[1] >= lo)
+
+    def passed(n):
+        sp = span(n)
+        return bool(sp) and (sp[1] < lo if desc else sp[0] > hi)
+
+    a, b = 1, pages
+    while a < b:
+        mid = (a + b) // 2
+        if reached(mid):
+            b = mid
+        else:
+            a = mid + 1
+
+    items = []
+    n = max(1, a - BISECT_SLACK_PAGES)
+    while n <= pages and not passed(n):
+        items.extend(page(n))
+        n += 1
+    print(f"[INFO] Date-window bisection read {len(cache)} of {pages} pages")
     return items
 
 # ==== CORE: fetch + normalize for your endpoint ====
-def fetch_employee_transactions(emp_code, start_date, end_date):
+FILTERS_FILE = "tx_filters.json"  # {site base URL: name of the transaction filter it honours}
+
+def _remember_filter(key, name):
+    known = load_json(FILTERS_FILE)
+    known[key] = name
+    save_json(FILTERS_FILE, known)
+    print(f"[INFO] {key} honours transaction filter '{name}'")
+
+def load_window(start_date, end_date, site=None):
+    """
+    Make sure every punch of the window (all employees) is in the local daily
+    summary: one bisected read unless it is already covered. False if the
+    server gives no page count to bisect on.
     """
-    Pull from /iclock/api/transactions/ and filter by emp_code and date range.
-    We try common filter params first; if backend ignores them, we paginate and filter client-side.
+    key = sites.base_url(site)
+    if rollups.is_covered(key, start_date, end_date):
+        return True
+    data = _bisect_window(f"{key}/iclock/api/transactions/", start_date, end_date)
+    if data is None:
+        return False
+    rollups.ingest(key, data)
+    rollups.mark_covered(key, start_date, end_date)
+    return True
+
+def fetch_employee_transactions(emp_code, start_date, end_date, site=None):
     """
-    base = f"{BASE_URL}/iclock/api/transactions/"
-    # Try server-side filters (edit if your backend uses different names)
-    param_attempts = [
-        {"emp_code": emp_code, "start": start_date, "end": end_date},
-        {"emp_code": emp_code, "from": start_date, "to": end_date},
-        {"emp_code": emp_code, "date__gte": start_date, "date__lte": end_date},
-        {"emp": emp_code, "start": start_date, "end": end_date},  # if it expects numeric emp id
-    ]
+    Pull from /iclock/api/transactions/ (of one site, primary by default) and filter
+    by emp_code and date range. We try common filter params first; if backend
+    ignores them, we bisect the stable page order for the date window and filter client-side.
+    """
+    key = sites.base_url(site)
+    base = f"{key}/iclock/api/transactions/"
+    # with shifts configured, night shifts at the edges need the neighbouring days
+    lo, hi = shifts.fetch_window(start_date, end_date)
+
+    def summarise(records):
+        if shifts.enabled():
+            return shifts.summarise(records, emp_code, start_date, end_date)
+        return _filter_and_group(records, emp_code, start_date, end_date)
+
+    def from_store():
+        if shifts.enabled():
+            return summarise(rollups.employee_punches(key, emp_code, lo, hi))
+        return rollups.days(key, emp_code, start_date, end_date)
+
+    # Today's punches (primary site) were prefetched after login
+    today = prefetch.peek("punches") if site in (None, sites.primary()) else None
+    if today and lo == hi == today["day"]:
+        return summarise(today["rows"])
+
+    # Days already downloaded in full are answered from the local store
+    if rollups.is_covered(key, lo, hi):
+        return from_store()
+
+    # Try server-side filters (edit if your backend uses different names);
+    # the one that worked last time on this site goes first
+    hit = load_json(FILTERS_FILE).get(key)
+
+    def param_attempts():
+        by_code = [
+            ("emp_code+start", {"emp_code": emp_code, "start": lo, "end": hi}),
+            ("emp_code+from", {"emp_code": emp_code, "from": lo, "to": hi}),
+            ("emp_code+date", {"emp_code": emp_code, "date__gte": lo, "date__lte": hi}),
+        ]
+        id_first = bool(hit) and hit.startswith("emp+")
+        if not id_first:
+            yield from sorted(by_code, key=lambda a: a[0] != hit)
+        # id-based filters need the internal employee id, not the code (looked up only now)
+        try:
+            emp_id = employee_ids.resolve(emp_code, site)
+        except Exception as e:
+            print("[WARN] could not resolve employee id:", e)
+            emp_id = None
+        if emp_id is not None:
+            yield from sorted([
+                ("emp+start_time", {"emp": emp_id, "start_time": f"{lo} 00:00:00",
+                                    "end_time": f"{hi} 23:59:59"}),
+                ("emp+start", {"emp": emp_id, "start": lo, "end": hi}),
+            ], key=lambda a: a[0] != hit)
+        if id_first:
+            yield from by_code
 
     # 1) try with params
-    for params in param_attempts:
+    for name, params in param_attempts():
         try:
-            data = _paginate(base, params=params)
+            data = _filtered_fetch(base, params, emp_code)
             if data:
-                return _filter_and_group(data, emp_code, start_date, end_date)
+                if name != hit:
+                    _remember_filter(key, name)
+                rollups.ingest(key, data)
+                return summarise(data)
         except Exception as e:
             print("[WARN] fetch with params failed:", e)
 
-    # 2) fallback: crawl pages and filter client-side (can be heavy if dataset is huge)
-    print("[INFO] Falling back to client-side filtering over pagination…")
+    # 2) fallback: only the pages that hold the date window, filtered client-side
+    print("[INFO] Falling back to date-window bisection over pagination…")
+    try:
+        if load_window(lo, hi, site):
+            # every punch of the window is local now: answer from the store
+            return from_store()
+    except Exception as e:
+        print("[WARN] bisection failed:", e)
+    # 3) last resort: crawl pages and filter client-side (can be heavy if dataset is huge)
     data = _paginate(base)  # will rely on "next" chain the server returns
-    return _filter_and_group(data, emp_code, start_date, end_date)
-
-def _filter_and_group(records, emp_code, start_date, end_date):
-    """Filter by emp_code and date window; then compute first/last punch per day."""
-    s, e = _to_date(start_date), _to_date(end_date)
-    out = {}
-    for r in records:
-        code = str(r.get("emp_code", "")).strip()
-        if code != str(emp_code).strip():
-            continue
-
-        # pick the best timestamp field
-        stamp = r.get("punch_time") or r.get("upload_time")
-        if not stamp:
-            continue
-
-        day = str(stamp)[:10]
-        d = _to_date(day)
-        if not d or (s and d < s) or (e and d > e):
-            continue
+    rollups.ingest(key, data)  # partial on errors, so the window is not marked covered
+    return summarise(data)
 
-        hhmm = _to_hhmm(stamp)
-        if not hhmm:
+def fetch_sites(emp_code, start_date, end_date, picked):
+    """
+    Same report from every picked site in parallel, merged per day.
+    Returns ({day: slot + "sites"}, {site: error}).
+    """
+    results = api.fan_out(lambda site: fetch_employee_transactions(emp_code, start_date, end_date, site), picked)
+    merged, errors = {}, {}
+    for site, (days, err) in results.items():
+        if err is not None:
+            errors[site] = err
             continue
-
-        slot = out.setdefault(day, {"first": None, "last": None, "punches": 0})
-        if slot["first"] is None or hhmm < slot["first"]:
-            slot["first"] = hhmm
-        if slot["last"] is None or hhmm > slot["last"]:
-            slot["last"] = hhmm
-        slot["punches"] += 1
-
+        for day, slot in (days or {}).items():
+            m = merged.setdefault(day, {"first": None, "last": None, "punches": 0, "flags": 0, "sites": []})
+            if slot["first"] and (m["first"] is None or shifts.sort_key(slot["first"]) < shifts.sort_key(m["first"])):
+                m["first"] = slot["first"]
+            if slot["last"] and (m["last"] is None or shifts.sort_key(slot["last"]) > shifts.sort_key(m["last"])):
+                m["last"] = slot["last"]
+            m["punches"] += slot["punches"]
+            m["flags"] |= slot.get("flags", 0)
+            m["sites"].append(site)
+            if "pairs" in slot:  # shift mode
+                m["pairs"] = sorted(m.get("pairs", []) + slot["pairs"], key=lambda p: shifts.sort_key(p[0]))
+                m["worked"] = m.get("worked", 0) + slot["worked"]
+                m["shift"] = m.get("shift") or slot["shift"]
+    return merged, errors
+
+VERIFY_NAMES = {"0": "Password", "1": "Fingerprint", "15": "Face", "25": "Palm"}
+
+def day_punches(emp_code, day, site=None, expected=None):
+    """
+    Raw punches behind one report day (the shift day with shifts configured),
+    oldest first: [{"time", "terminal", "verify"}]. Read from the local store
+    or today's prefetched punches; only if the day is missing there (fewer
+    than `expected` punches) one narrow query for that day goes to the server.
+    """
+    key = sites.base_url(site)
+    want = str(emp_code).strip()
+    lo, hi = shifts.fetch_window(day, day)
+
+    def local():
+        rows = rollups.employee_punches(key, want, lo, hi)
+        today = prefetch.peek("punches") if site in (None, sites.primary()) else None
+        if today and lo <= today["day"] <= hi:
+            rows += [r for r in today["rows"] if str(r.get("emp_code", "")).strip() == want]
+        return rows
+
+    def of_day(rows):
+        seen, out = set(), []
+        for r in rows:
+            t = shifts.parse(r.get("punch_time") or r.get("upload_time"))
+            rid = str(r["id"]) if r.get("id") is not None else (t, r.get("terminal_alias") or r.get("terminal_sn"))
+            if t and rid not in seen:
+                seen.add(rid)
+                out.append((t, r))
+        out.sort(key=lambda p: p[0])
+        if shifts.enabled():  # keep the punches of the shift instances starting that day
+            mine = {t for inst in shifts.instances([t for t, _ in out])
+                    if inst["day"].strftime("%Y-%m-%d") == day for t in inst["punches"]}
+            return [p for p in out if p[0] in mine]
+        return [p for p in out if p[0].strftime("%Y-%m-%d") == day]
+
+    found = of_day(local())
+    if len(found) < (expected or 1) and not rollups.is_covered(key, lo, hi):
+        fetch_employee_transactions(want, day, day, site)  # ingests what it downloads
+        found = of_day(local())
+
+    d0 = datetime.strptime(day, "%Y-%m-%d").date()
+    out = []
+    for t, r in found:
+        shift = (t.date() - d0).days
+        verify = str(r.get("verify_type") if r.get("verify_type") is not None else "")
+        out.append({"time": t.strftime("%H:%M:%S") + (f"{shift:+d}" if shift else ""),
+                    "terminal": r.get("terminal_alias") or r.get("terminal_sn") or "",
+                    "verify": VERIFY_NAMES.get(verify, verify)})
     return out
 
+def _filter_and_group(records, emp_code, start_date, end_date):
+    """Filter by emp_code and date window; then compute first/last punch per day."""
+    # one employee's punches; whole crawls are folded on all cores by rollups.ingest
+    grouped = aggregate.group(records, emp_code, start_date, end_date)
+    return {day: slot for (_, day), slot in grouped.items()}
+
 # ==== UI ====
 def open_employee_attendance(parent=None):
     win = tk.Toplevel(parent) if parent else tk.Toplevel()
@@ -158,6 +341,7 @@ def open_employee_attendance(parent=None):
     win.geometry("860x640")
 
     _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
 
     form = tk.Frame(win, bg=BG); form.pack(fill="x", padx=10, pady=6)
     tk.Label(form, text="Employee Code:", fg=FG, bg=BG).grid(row=0, column=0, sticky="w", pady=2)
@@ -170,24 +354,70 @@ def open_employee_attendance(parent=None):
     tk.Label(form, text="To (optional):", fg=FG, bg=BG).grid(row=1, column=2, sticky="w", pady=2)
     to_entry = DateEntry(form, date_pattern='yyyy-mm-dd'); to_entry.grid(row=1, column=3, sticky="w", padx=(6, 0))
 
-    btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=10, pady=6)
-
-    result_box = tk.Text(win, width=110, height=24, state='disabled',
-                         font=('Consolas', 10), bg="#0e0e0e", fg="white")
-    result_box.pack(padx=10, pady=(6,10), fill="both", expand=True)
-
-    store = {"rows": []}  # for export
+    pick_sites = add_site_picker(win, BG, FG)
 
-    def render(rows):
-        result_box.config(state="normal"); result_box.delete(1.0, tk.END)
-        lines = []
-        lines.append(f"{'Date':10}  {'First':8}  {'Last':8}  {'Punches':7}")
-        lines.append(f"{'-'*10}  {'-'*8}  {'-'*8}  {'-'*7}")
-        for d, first, last, n in rows:
-            lines.append(f"{d:10}  {first:8}  {last:8}  {str(n):7}")
-        result_box.insert(tk.END, "\n".join(lines))
-        result_box.config(state="disabled")
+    btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=10, pady=6)
 
+    notes_var = tk.StringVar()
+    tk.Label(win, textvariable=notes_var, fg="orange", bg=BG, anchor="w", justify="left")\
+        .pack(fill="x", padx=10)
+
+    # one row per day; expanding a day lists its raw punches (loaded on first expand)
+    result_tree = ttk.Treeview(win, show="tree headings", height=24)
+    result_tree.pack(padx=10, pady=(6,10), fill="both", expand=True)
+
+    store = {"rows": [], "header": [], "query": None, "days": {}}  # rows/header for export
+    widths = {"Date": 10, "First": 8, "Last": 8, "Punches": 7, "Shift": 12, "Worked": 6, "Flags": 16}
+    DETAIL = ["Terminal", "Verify"]
+    PENDING = "loading"  # placeholder child until a day is expanded
+
+    def render(rows, header, notes=()):
+        # Date/First/Last/Punches, plus Shift/Worked/In-Out with shifts configured,
+        # plus Flags with anomaly rules on, plus Site(s)
+        result_tree.delete(*result_tree.get_children())
+        store["days"] = {}
+        notes_var.set("\n".join(notes))
+        cols = list(header[1:]) + DETAIL
+        result_tree["columns"] = cols
+        result_tree.heading("#0", text=header[0], anchor="w")
+        result_tree.column("#0", width=widths["Date"] * 11 + 30, stretch=False)
+        for c in cols:
+            result_tree.heading(c, text=c, anchor="w")
+            result_tree.column(c, width=widths.get(c, 20) * 9, anchor="w")
+        flagged = header.index("Flags") if "Flags" in header else None
+        result_tree.tag_configure("flagged", foreground="orange")
+        for r in rows:
+            tags = ("flagged",) if flagged is not None and r[flagged] else ()
+            iid = result_tree.insert("", "end", text=r[0], values=list(r[1:]) + ["", ""], tags=tags)
+            if r[3]:
+                store["days"][iid] = r
+                result_tree.insert(iid, "end", iid=f"{iid}:{PENDING}", text="…")
+
+    def on_expand(event=None):
+        iid = result_tree.focus()
+        if f"{iid}:{PENDING}" not in result_tree.get_children(iid):
+            return
+        row = store["days"][iid]
+        emp, picked, tagged = store["query"]
+        day_sites = [x.strip() for x in row[-1].split(",")] if tagged else [None]
+        result_tree.delete(f"{iid}:{PENDING}")
+        blank = [""] * (len(result_tree["columns"]) - len(DETAIL))
+        for site in day_sites:
+            try:
+                found = day_punches(emp, row[0], site, None if tagged else row[3])
+            except Exception as e:
+                result_tree.insert(iid, "end", text=f"  {site or ''} failed",
+                                   values=blank + [str(e), ""])
+                continue
+            for p in found:
+                vals = blank[:]
+                if tagged:
+                    vals[-1] = site
+                result_tree.insert(iid, "end", text=f"  {p['time']}", values=vals + [p["terminal"], p["verify"]])
+
+    result_tree.bind("<<TreeviewOpen>>", on_expand)
+
+    @profiling.profiled("attendance Search")
     def do_search():
         emp = emp_var.get().strip()
         if not emp:
@@ -199,8 +429,22 @@ def open_employee_attendance(parent=None):
             messagebox.showwarning("Date Range", "End date must be on or after the start date.")
             return
 
-        data = fetch_employee_transactions(emp, s, e)
+        picked = pick_sites()
+        if not picked:
+            messagebox.showwarning("Sites", "Tick at least one site.")
+            return
+        tagged, notes = picked != [sites.primary()], []
+        if tagged:
+            data, errors = fetch_sites(emp, s, e, picked)
+            notes = [f"[{site}] failed: {err}" for site, err in errors.items()]
+        else:
+            data = fetch_employee_transactions(emp, s, e)
         # turn dict->sorted rows; fill all days in range (so missing days appear)
+        by_shift, flags = shifts.enabled(), anomalies.enabled()
+        header = ["Date", "First", "Last", "Punches"]
+        header += ["Shift", "Worked", "In-Out"] if by_shift else []
+        header += ["Flags"] if flags else []
+        header += ["Site(s)"] if tagged else []
         rows = []
         d = _to_date(s)
         endd = _to_date(e)
@@ -213,12 +457,25 @@ def open_employee_attendance(parent=None):
                 n     = slot["punches"]
             else:
                 first = last = "--:--"; n = 0
-            rows.append((key, first, last, n))
+            row = [key, first, last, n]
+            if by_shift:
+                row += [slot.get("shift", ""), shifts.fmt_minutes(slot.get("worked", 0)),
+                        shifts.fmt_pairs(slot.get("pairs", []))] if slot else ["", "", ""]
+            if flags:
+                row.append(anomalies.names(slot.get("flags", 0)) if slot else "")
+            if tagged:
+                row.append(", ".join(slot.get("sites", [])) if slot else "")
+            rows.append(tuple(row))
             d += timedelta(days=1)
+        summary = anomalies.summary_text(data.values()) if flags else ""
+        if summary:
+            notes.append(summary)
 
-        store["rows"] = rows
-        render(rows)
+        store["rows"], store["header"] = rows, header
+        store["query"] = (emp, picked, tagged)
+        render(rows, header, notes)
 
+    @profiling.profiled("attendance Export")
     def do_export():
         if not store["rows"]:
             messagebox.showinfo("Nothing to Export", "Run a search first.")
@@ -230,7 +487,7 @@ def open_employee_attendance(parent=None):
         )
         if not path: return
         try:
-            header = ["Date", "First", "Last", "Punches"]
+            header = store["header"]
             if path.lower().endswith(".xlsx") and HAVE_XLSX:
                 wb = Workbook(); ws = wb.active; ws.title = "Attendance"
                 ws.append(header)
@@ -243,6 +500,36 @@ def open_employee_attendance(parent=None):
         except Exception as e:
             messagebox.showerror("Export Failed", f"Could not save file.\n\n{e}")
 
+    @profiling.profiled("attendance Export columnar")
+    def do_export_columnar():
+        if not columnar.HAVE_ARROW:
+            messagebox.showinfo("Parquet / Arrow", "Columnar export needs pyarrow.\n\npip install pyarrow")
+            return
+        s = from_entry.get_date().strftime("%Y-%m-%d")
+        e = to_entry.get_date().strftime("%Y-%m-%d")
+        if _to_date(e) < _to_date(s):
+            messagebox.showwarning("Date Range", "End date must be on or after the start date.")
+            return
+        picked = pick_sites()
+        if not picked:
+            messagebox.showwarning("Sites", "Tick at least one site.")
+            return
+        root = filedialog.askdirectory(title="Folder for the Parquet / Arrow export")
+        if not root: return
+        # all employees' punches of the window, downloaded once per site
+        loaded = api.fan_out(lambda site: load_window(s, e, site), picked)
+        failed = [f"{site}: {err or 'no page count to bisect on'}"
+                  for site, (ok, err) in loaded.items() if not ok]
+        keys = {site: sites.base_url(site) for site, (ok, _) in loaded.items() if ok}
+        try:
+            done = columnar.export(root, keys, s, e)
+        except Exception as ex:
+            messagebox.showerror("Export Failed", f"Could not write the export.\n\n{ex}")
+            return
+        note = ("\n\nSkipped:\n" + "\n".join(failed)) if failed else ""
+        messagebox.showinfo("Exported", f"{done['raw']} punches and {done['daily']} daily rows "
+                                        f"in {done['files']} files under:\n{root}{note}")
+
     def mkbtn(t, cmd):
         b = tk.Button(btns, text=t, command=cmd, bg=BTN_BG, fg="white",
                       activebackground=BTN_H, activeforeground="white",
@@ -251,7 +538,9 @@ def open_employee_attendance(parent=None):
 
     mkbtn("Search", do_search)
     mkbtn("Export to Excel", do_export)
-    mkbtn("Close", win.destroy)
+    mkbtn("Export Parquet", do_export_columnar)
+    mkbtn("Close", lambda: close_window(win))
+    return win
 
 # Backwards-compat if your router still calls this name:
 def open_department_attendance(parent=None):
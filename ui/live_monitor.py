@@ -0,0 +1,305 @@
+# File: ui/live_monitor.py
+# Live view of today's punches. After one load of today's transactions it only
+# asks the server for records past the newest one seen (id__gt, or
+# upload_time__gte). Servers that ignore both filters get a count probe
+# instead: a page_size=1 request tells the total, and only the pages holding
+# the new tail are read. New punches update a per-employee state dict and
+# just the changed rows of the table.
+import os, sys, queue, threading
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+from utils import api, prefetch, rollups, sites
+from ui.employee_attendance import _bisect_window, _stamp
+from ui.common import add_outage_banner
+
+# ===== THEME =====
+BG, FG = "black", "white"
+BTN_BG, BTN_H = "#222", "#333"
+
+# Poll interval (seconds): halves when punches arrive, backs off x1.5 when idle,
+# and stays at the minimum around shift changes.
+POLL_MIN = 5
+POLL_MAX = 60
+SHIFT_CHANGES = ["08:00", "17:00"]   # local HH:MM
+SHIFT_WINDOW_MIN = 30                 # +/- minutes around each change
+
+def _asset_path(*parts):
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base, "assets", *parts)
+
+def _add_header(win, text=""):
+    header = tk.Frame(win, bg=BG)
+    header.pack(fill="x", pady=(3, 5))
+    logo = tk.Label(header, bg=BG)
+    lp = _asset_path("newg.png")
+    if os.path.exists(lp):
+        try:
+            from PIL import Image, ImageTk
+            img = Image.open(lp); img.thumbnail((60, 60))
+            ph = ImageTk.PhotoImage(img)
+            logo.image = ph; logo.config(image=ph)
+        except Exception:
+            try:
+                ph = tk.PhotoImage(file=lp)
+                logo.image = ph; logo.config(image=ph)
+            except Exception:
+                logo.config(text="[LOGO]", fg=FG)
+    else:
+        logo.config(text="[LOGO]", fg=FG)
+    logo.pack(side="left", padx=(5, 8))
+    if text:
+        tk.Label(header, text=text, font=("Segoe UI", 9, "bold"), fg=FG, bg=BG)\
+          .pack(side="left", pady=(15, 0))
+
+# ==== Delta polling ====
+def _near_shift_change(now=None):
+    now = now or datetime.now()
+    minutes = now.hour * 60 + now.minute
+    for hhmm in SHIFT_CHANGES:
+        h, m = (int(x) for x in hhmm.split(":"))
+        if abs(minutes - (h * 60 + m)) <= SHIFT_WINDOW_MIN:
+            return True
+    return False
+
+def next_interval(current, got_new, now=None):
+    if _near_shift_change(now):
+        return POLL_MIN
+    if got_new:
+        return max(POLL_MIN, current / 2)
+    return min(POLL_MAX, current * 1.5)
+
+def _count(url):
+    return int(api.fetch_page(url, 1, {"page_size": 1}, fresh=True)[1] or 0)
+
+def _see(st, r):
+    """Remember a record and move the newest id / upload_time seen."""
+    rid = r.get("id")
+    st["seen"].add(rid)
+    try:
+        st["max_id"] = max(st["max_id"] or 0, int(rid))
+    except (TypeError, ValueError):
+        pass
+    up = str(r.get("upload_time") or "")
+    if up > st["max_upload"]:
+        st["max_upload"] = up
+
+def _after(st):
+    """[(name, params)] asking for records past the newest seen, by preference."""
+    out = []
+    if st["max_id"] is not None:
+        out.append(("id__gt", {"id__gt": st["max_id"]}))
+    if st["max_upload"]:
+        out.append(("upload_time__gte", {"upload_time__gte": st["max_upload"]}))
+    return out
+
+def _pick_filter(st):
+    """The first filter the server honours (fewer records than the whole list), else False."""
+    for name, params in _after(st):
+        try:
+            count = api.fetch_page(st["url"], 1, dict(params, page_size=1), fresh=True)[1]
+        except Exception as e:
+            print(f"[WARN] live filter {name}:", e)
+            continue
+        if count is not None and int(count) < st["count"]:
+            print(f"[INFO] live monitor polls with {name}")
+            return name
+    return False if _after(st) else None  # None: nothing seen yet, try again later
+
+def tail_open(url, day):
+    """Load `day` once and remember where the list ended. Returns (state, rows)."""
+    st = {"url": url, "day": day, "count": _count(url), "seen": set(), "desc": False,
+          "max_id": None, "max_upload": ""}
+    cached = prefetch.peek("punches")
+    if cached and cached["day"] == day and url.startswith(sites.base_url()):
+        rows = list(cached["rows"])
+    else:
+        rows = _bisect_window(url, day, day) or []
+    rows = [r for r in rows if _stamp(r)[:10] == day]
+    # newest-first lists put new records on page 1; oldest-first on the last page
+    if st["count"] > 1:
+        first = api.fetch_page(url, 1, {"page_size": 1})[0]
+        last = api.fetch_page(url, st["count"], {"page_size": 1})[0]
+        if first and last:
+            st["desc"] = _stamp(first[0]) > _stamp(last[0])
+    # tail page math needs the page size the server really uses (clamped)
+    probe, _, has_next = api.fetch_page(url, 1, fresh=True)
+    st["size"] = len(probe) if has_next and probe else api.page_size_for(api.endpoint_of(url))
+    # every record on the tail page counts as seen, earlier days included
+    tail = probe
+    if has_next and not st["desc"]:
+        tail = api.fetch_page(url, -(-st["count"] // st["size"]), {"page_size": st["size"]}, fresh=True)[0]
+    for r in rows + list(tail):
+        _see(st, r)
+    st["filter"] = _pick_filter(st)
+    return st, rows
+
+def tail_poll(st):
+    """
+    Records added since the last call: O(new records), one small request when
+    idle. May include late uploads stamped on earlier days.
+    """
+    if st["filter"] is None and st["seen"]:
+        st["filter"] = _pick_filter(st)
+    if st["filter"]:
+        return _poll_after(st)
+    return _poll_count(st)
+
+def _poll_after(st):
+    """Every record past the newest seen, whatever its place in the list."""
+    params = dict(dict(_after(st))[st["filter"]], page_size=st["size"])
+    out, page = [], 1
+    while True:
+        rows, _, has_next = api.fetch_page(st["url"], page, params, fresh=True)
+        for r in rows:
+            if r.get("id") not in st["seen"]:
+                _see(st, r)
+                out.append(r)
+        if not has_next or not rows:
+            return out
+        page += 1
+
+def _poll_count(st):
+    """
+    Servers without the filters: read the pages the total count says grew.
+    A late upload sorted mid-list, or a delete and an insert within one
+    interval, are only picked up by the next open.
+    """
+    url, size = st["url"], st["size"]
+    count = _count(url)
+    if count == st["count"]:
+        return []
+    if count < st["count"]:
+        # records were deleted upstream; indexes moved - re-read the tail of today
+        st["count"] = count
+        return [r for r in (_bisect_window(url, st["day"], st["day"]) or []) if r.get("id") not in st["seen"]]
+    new = count - st["count"]
+    if st["desc"]:
+        pages = range(1, -(-new // size) + 1)
+    else:
+        pages = range(st["count"] // size + 1, -(-count // size) + 1)
+    out = []
+    for p in pages:
+        rows, _, _ = api.fetch_page(url, p, {"page_size": size}, fresh=True)
+        for r in rows:
+            if r.get("id") not in st["seen"]:
+                _see(st, r)
+                out.append(r)
+    st["count"] = count
+    return out
+
+def apply_punch(people, r):
+    """Fold one punch into the per-employee state; returns the emp_code touched."""
+    code = str(r.get("emp_code", "")).strip()
+    hhmm = _stamp(r)[11:16]
+    p = people.get(code)
+    if p is None:
+        name = f"{r.get('first_name') or ''} {r.get('last_name') or ''}".strip()
+        p = people[code] = {"name": name, "first": hhmm, "last": hhmm, "punches": 0, "terminal": ""}
+    p["first"] = min(p["first"], hhmm)
+    if hhmm >= p["last"]:
+        p["last"] = hhmm
+        p["terminal"] = r.get("terminal_alias") or r.get("terminal_sn") or ""
+    p["punches"] += 1
+    return code
+
+# ==== UI ====
+def open_live_monitor(parent=None):
+    win = tk.Toplevel(parent) if parent else tk.Toplevel()
+    win.title("Live Attendance")
+    win.configure(bg=BG)
+    win.geometry("860x640")
+
+    _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
+
+    status_var = tk.StringVar(value="Loading today's punches…")
+    tk.Label(win, textvariable=status_var, fg=FG, bg=BG, anchor="w").pack(fill="x", padx=10)
+
+    cols = ("code", "name", "first", "last", "punches", "status", "terminal")
+    tree = ttk.Treeview(win, columns=cols, show="headings", height=24)
+    for c, w in zip(cols, (90, 200, 70, 70, 70, 70, 160)):
+        tree.heading(c, text=c.title())
+        tree.column(c, width=w, anchor="w")
+    tree.pack(fill="both", expand=True, padx=10, pady=6)
+
+    url = f"{sites.base_url()}/iclock/api/transactions/"
+    people = {}                 # emp_code -> {name, first, last, punches, terminal}
+    inbox = queue.Queue()       # worker -> UI thread: ("rows"|"reset", [...]) / ("error", msg)
+    stop = threading.Event()
+    ui = {"interval": POLL_MIN, "total": 0, "updated": "-"}
+
+    def on_close():
+        stop.set()
+        win.destroy()
+
+    btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=10, pady=(0, 8))
+    tk.Button(btns, text="Close", command=on_close, bg=BTN_BG, fg="white",
+              activebackground=BTN_H, activeforeground="white",
+              padx=14, pady=8, relief="flat", cursor="hand2").pack(side="left")
+
+    def show(code):
+        p = people[code]
+        values = (code, p["name"], p["first"], p["last"], p["punches"],
+                  "IN" if p["punches"] % 2 else "OUT", p["terminal"])
+        if tree.exists(code):
+            tree.item(code, values=values)
+            tree.move(code, "", 0)  # most recent activity on top
+        else:
+            tree.insert("", 0, iid=code, values=values)
+
+    def worker():
+        st = None
+        while True:
+            today = datetime.now().strftime("%Y-%m-%d")
+            try:
+                if st is None or today != st["day"]:
+                    # first load, a new day, or an open that failed: (re)load the day
+                    st, rows = tail_open(url, today)
+                    rollups.ingest(sites.base_url(), rows)
+                    inbox.put(("reset", rows))
+                else:
+                    rows = tail_poll(st)
+                    # a late punch for a past day only touches that day's summary row
+                    rollups.ingest(sites.base_url(), rows)
+                    rows = [r for r in rows if _stamp(r)[:10] == st["day"]]
+                    inbox.put(("rows", rows))
+            except Exception as e:
+                inbox.put(("error", str(e)))
+                rows = []
+            ui["interval"] = next_interval(ui["interval"], bool(rows))
+            if stop.wait(ui["interval"]):
+                return
+
+    def pump():
+        if stop.is_set():
+            return
+        try:
+            while True:
+                kind, payload = inbox.get_nowait()
+                if kind == "error":
+                    status_var.set(f"Poll failed: {payload} (retrying)")
+                    continue
+                if kind == "reset":
+                    people.clear(); tree.delete(*tree.get_children()); ui["total"] = 0
+                touched = {apply_punch(people, r) for r in sorted(payload, key=_stamp)}
+                for code in touched:
+                    show(code)
+                ui["total"] += len(payload)
+                ui["updated"] = datetime.now().strftime("%H:%M:%S")
+                present = sum(1 for p in people.values() if p["punches"] % 2)
+                status_var.set(f"{len(people)} employees punched today, {present} in | "
+                               f"{ui['total']} punches | updated {ui['updated']} | "
+                               f"next poll in {ui['interval']:.0f}s")
+        except queue.Empty:
+            pass
+        win.after(500, pump)
+
+    win.protocol("WM_DELETE_WINDOW", on_close)
+    threading.Thread(target=worker, name="live-monitor", daemon=True).start()
+    pump()
+    return win
+
+def main(): return open_live_monitor()
+def run():  return open_live_monitor()
@@ -1,10 +1,14 @@
 # File: ui/main_menu.py
 import os
 import sys
+import inspect
 import traceback
 import tkinter as tk
 from tkinter import messagebox
 
+from utils import profiling
+from ui.common import add_outage_banner
+
 BG = "black"
 FG = "white"
 BTN_BG = "#222"
@@ -32,40 +36,78 @@ def _resolve_asset(path_or_none):
             return candidate
     return None
 
-def _safe_open(module_name, candidate_funcs, parent=None):
-    """Import ui.<module_name> and call an entry function, showing errors in a dialog."""
+_entries = {}   # module -> (entry function, its name, takes parent), resolved on the first open
+_windows = {}   # module -> its window, kept (hidden on close) so reopening shows it as it was left
+
+def _resolve_entry(module_name, candidate_funcs):
+    """Import ui.<module_name> and find its entry function; errors are shown in a dialog."""
     try:
         mod = __import__(f"ui.{module_name}", fromlist=["*"])
     except Exception as e:
         tb = traceback.format_exc()
         messagebox.showerror("Load Error", f"Could not import ui.{module_name}\n\n{e}\n\n{tb}")
         print(f"[ERROR] import ui.{module_name}:\n{tb}")
-        return
+        return None
 
     # Try common entry names in order
     candidates = list(dict.fromkeys(candidate_funcs + [
         "open_window", "open_ui", "show", "start", "launch", f"open_{module_name}"
     ]))
 
-    import inspect
     for fname in candidates:
         fn = getattr(mod, fname, None)
         if callable(fn):
-            try:
-                sig = inspect.signature(fn)
-                if len(sig.parameters) >= 1:
-                    return fn(parent)  # pass parent if accepted
-                else:
-                    return fn()        # call without args
-            except Exception as e:
-                tb = traceback.format_exc()
-                messagebox.showerror("Runtime Error", f"{module_name}.{fname}() failed:\n\n{e}\n\n{tb}")
-                print(f"[ERROR] {module_name}.{fname}():\n{tb}")
-                return
+            return fn, fname, len(inspect.signature(fn).parameters) >= 1
 
     messagebox.showerror("Entry Not Found",
                          f"No usable entry function found in ui.{module_name}.\nTried: {', '.join(candidates)}")
     print(f"[WARN] No entry point in ui.{module_name}: {candidates}")
+    return None
+
+def _raise_existing(module_name):
+    """Show the module's kept window again (data, last query and results intact)."""
+    win = _windows.get(module_name)
+    try:
+        if win is not None and win.winfo_exists():
+            win.deiconify()
+            win.lift()
+            win.focus_set()
+            return win
+    except tk.TclError:
+        pass
+    _windows.pop(module_name, None)
+    return None
+
+def _safe_open(module_name, candidate_funcs, parent=None):
+    """Open (or bring back) a module window, showing errors in a dialog."""
+    win = _raise_existing(module_name)
+    if win is not None:
+        return win
+
+    entry = _entries.get(module_name)
+    if entry is None:
+        entry = _resolve_entry(module_name, candidate_funcs)
+        if entry is None:
+            return
+        _entries[module_name] = entry
+    fn, fname, takes_parent = entry
+
+    try:
+        with profiling.action(f"open {module_name}"):
+            win = fn(parent) if takes_parent else fn()  # pass parent if accepted
+    except Exception as e:
+        tb = traceback.format_exc()
+        messagebox.showerror("Runtime Error", f"{module_name}.{fname}() failed:\n\n{e}\n\n{tb}")
+        print(f"[ERROR] {module_name}.{fname}():\n{tb}")
+        return
+
+    if isinstance(win, tk.Toplevel):
+        # closing hides the window; modules with their own close handler
+        # (live views that stop their polling) are rebuilt on the next open
+        if not win.protocol("WM_DELETE_WINDOW"):
+            win.protocol("WM_DELETE_WINDOW", win.withdraw)
+        _windows[module_name] = win
+    return win
 
 def _header(parent, logo_path, header_text):
     header = tk.Frame(parent, bg=BG)
@@ -152,6 +194,7 @@ def launch_menu(title, theme, logo_path, icon_path, modules, header_text="ALPAGO
     container.pack(fill="both", expand=True)
 
     _header(container, logo_resolved or logo_path, header_text)
+    add_outage_banner(container, BG)
 
     tk.Label(
         container, text="Choose a module:", fg=FG, bg=BG, font=("Segoe UI", 10)
@@ -0,0 +1,202 @@
+# File: ui/terminals.py
+# Terminal fleet status: every iclock terminal of the selected sites, the
+# server's last-activity time, and minutes since the terminal's last punch.
+# The device list is read with concurrent page requests each cycle; the last
+# punch comes from transactions already on this PC (the local attendance
+# store plus today's prefetched punches), so no transactions are crawled.
+import os, sys, queue, threading
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime, timedelta
+
+from utils import api, prefetch, rollups, sites
+from ui.common import add_outage_banner, add_site_picker
+
+# ===== THEME =====
+BG, FG = "black", "white"
+BTN_BG, BTN_H = "#222", "#333"
+
+POLL_SECONDS = 60
+LOOKBACK_DAYS = 7        # how far back the local store is searched for a terminal's last punch
+OFFLINE_MIN = 15         # server last_activity older than this: OFFLINE
+STALE_MIN = 120          # no punch for this long: STALE
+
+def _asset_path(*parts):
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(base, "assets", *parts)
+
+def _add_header(win, text=""):
+    header = tk.Frame(win, bg=BG)
+    header.pack(fill="x", pady=(3, 5))
+    logo = tk.Label(header, bg=BG)
+    lp = _asset_path("newg.png")
+    if os.path.exists(lp):
+        try:
+            from PIL import Image, ImageTk
+            img = Image.open(lp); img.thumbnail((60, 60))
+            ph = ImageTk.PhotoImage(img)
+            logo.image = ph; logo.config(image=ph)
+        except Exception:
+            try:
+                ph = tk.PhotoImage(file=lp)
+                logo.image = ph; logo.config(image=ph)
+            except Exception:
+                logo.config(text="[LOGO]", fg=FG)
+    else:
+        logo.config(text="[LOGO]", fg=FG)
+    logo.pack(side="left", padx=(5, 8))
+    if text:
+        tk.Label(header, text=text, font=("Segoe UI", 9, "bold"), fg=FG, bg=BG)\
+          .pack(side="left", pady=(15, 0))
+
+# ==== Data ====
+def _minutes_since(stamp, now):
+    if not stamp:
+        return None
+    try:
+        t = datetime.strptime(str(stamp)[:19].replace("T", " "), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    return max(0, int((now - t).total_seconds() // 60))
+
+def list_terminals(site=None):
+    """All terminals of a site; list pages are requested concurrently."""
+    out = []
+    for rows in api.iter_pages_parallel(f"{sites.base_url(site)}/iclock/api/terminals/"):
+        out.extend(rows)
+    return out
+
+def last_punches(site=None, now=None):
+    """{terminal alias or serial: newest punch stamp} from local data only."""
+    now = now or datetime.now()
+    key = sites.base_url(site)
+    since = (now - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    last = rollups.last_punch_by_terminal(key, since)
+    today = prefetch.peek("punches") if key == sites.base_url() else None
+    for r in (today or {}).get("rows", []):
+        stamp = str(r.get("punch_time") or r.get("upload_time") or "")[:19].replace("T", " ")
+        for term in (r.get("terminal_alias"), r.get("terminal_sn")):
+            if term and stamp > last.get(term, ""):
+                last[term] = stamp
+    return last
+
+def fleet(site=None, now=None):
+    """One status row per terminal of a site, problems first."""
+    now = now or datetime.now()
+    last = last_punches(site, now)
+    rows = []
+    for t in list_terminals(site):
+        sn, alias = t.get("sn") or "", t.get("alias") or ""
+        punch = max(last.get(sn, ""), last.get(alias, "")) or None
+        since_punch = _minutes_since(punch, now)
+        since_seen = _minutes_since(t.get("last_activity"), now)
+        if since_seen is not None and since_seen > OFFLINE_MIN:
+            status = "OFFLINE"
+        elif since_punch is None:
+            status = "NO DATA"
+        elif since_punch > STALE_MIN:
+            status = "STALE"
+        else:
+            status = "OK"
+        area = t.get("area")
+        rows.append({"sn": sn, "alias": alias, "ip": t.get("ip_address") or "",
+                     "area": area.get("area_name", "") if isinstance(area, dict) else str(area or ""),
+                     "seen": str(t.get("last_activity") or "")[:16].replace("T", " "),
+                     "punch": (punch or "")[:16], "since": since_punch, "status": status})
+    order = {"OFFLINE": 0, "STALE": 1, "NO DATA": 2, "OK": 3}
+    rows.sort(key=lambda r: (order[r["status"]], -(r["since"] or 0), r["sn"]))
+    return rows
+
+# ==== UI ====
+def open_terminals(parent=None):
+    win = tk.Toplevel(parent) if parent else tk.Toplevel()
+    win.title("Terminals")
+    win.configure(bg=BG)
+    win.geometry("980x640")
+
+    _add_header(win, "")  # logo only
+    add_outage_banner(win, BG)
+    pick_sites = add_site_picker(win, BG, FG)
+
+    status_var = tk.StringVar(value="Loading terminals…")
+    tk.Label(win, textvariable=status_var, fg=FG, bg=BG, anchor="w").pack(fill="x", padx=10)
+
+    cols = ("site", "sn", "alias", "ip", "area", "seen", "punch", "since", "status")
+    heads = ("Site", "Serial", "Alias", "IP", "Area", "Last activity", "Last punch", "Min since punch", "Status")
+    tree = ttk.Treeview(win, columns=cols, show="headings", height=24)
+    for c, h, w in zip(cols, heads, (80, 110, 140, 100, 100, 120, 120, 110, 80)):
+        tree.heading(c, text=h)
+        tree.column(c, width=w, anchor="w")
+    tree.pack(fill="both", expand=True, padx=10, pady=6)
+    tree.tag_configure("OFFLINE", foreground="#ff6b6b")
+    tree.tag_configure("STALE", foreground="#ffb347")
+    tree.tag_configure("NO DATA", foreground="#aaaaaa")
+
+    inbox = queue.Queue()       # worker -> UI thread: ("rows", [...], errors) / ("error", msg)
+    stop = threading.Event()
+    wake = threading.Event()
+    picked = {"sites": pick_sites()}
+
+    def on_close():
+        stop.set(); wake.set()
+        win.destroy()
+
+    def refresh_now():
+        picked["sites"] = pick_sites()
+        wake.set()
+
+    btns = tk.Frame(win, bg=BG); btns.pack(fill="x", padx=10, pady=(0, 8))
+    for text, cmd in (("Refresh", refresh_now), ("Close", on_close)):
+        tk.Button(btns, text=text, command=cmd, bg=BTN_BG, fg="white",
+                  activebackground=BTN_H, activeforeground="white",
+                  padx=14, pady=8, relief="flat", cursor="hand2").pack(side="left", padx=(0, 8))
+
+    def worker():
+        while not stop.is_set():
+            try:
+                now = datetime.now()
+                results = api.fan_out(lambda site: fleet(site, now), picked["sites"])
+                rows, errors = [], []
+                for site, (site_rows, err) in results.items():
+                    if err is not None:
+                        errors.append(f"{site}: {err}")
+                    for r in site_rows or []:
+                        rows.append(dict(r, site=site))
+                inbox.put(("rows", rows, errors))
+            except Exception as e:
+                inbox.put(("error", str(e), None))
+            wake.wait(POLL_SECONDS)
+            wake.clear()
+
+    def pump():
+        if stop.is_set():
+            return
+        try:
+            while True:
+                kind, payload, errors = inbox.get_nowait()
+                if kind == "error":
+                    status_var.set(f"Refresh failed: {payload} (retrying)")
+                    continue
+                tree.delete(*tree.get_children())
+                for r in payload:
+                    since = "" if r["since"] is None else r["since"]
+                    tree.insert("", "end", values=(r["site"], r["sn"], r["alias"], r["ip"], r["area"],
+                                                   r["seen"], r["punch"], since, r["status"]),
+                                tags=(r["status"],))
+                bad = sum(1 for r in payload if r["status"] != "OK")
+                text = (f"{len(payload)} terminals, {bad} need attention | "
+                        f"updated {datetime.now():%H:%M:%S}, every {POLL_SECONDS}s")
+                if errors:
+                    text += " | failed: " + "; ".join(errors)
+                status_var.set(text)
+        except queue.Empty:
+            pass
+        win.after(500, pump)
+
+    win.protocol("WM_DELETE_WINDOW", on_close)
+    threading.Thread(target=worker, name="terminals", daemon=True).start()
+    pump()
+    return win
+
+def main(): return open_terminals()
+def run():  return open_terminals()
@@ -0,0 +1,160 @@
+# File: utils/aggregate.py
+# First/last/count per (emp_code, day) over downloaded transactions. Every
+# crawl the app stores goes through fold() (utils.rollups.ingest, before any
+# per-employee filtering); group() serves one employee's report.
+# Small inputs are grouped in-process. Large crawls are split into chunks that
+# a process pool parses and partially groups in parallel (timestamp parsing
+# is CPU-bound and the GIL keeps it on one core); the partial results are
+# merged with min/max/sum, which is associative, so chunk order never matters.
+# Data-quality flags (utils.anomalies) are raised in the same pass.
+# Kept free of UI imports so the spawned workers start quickly.
+#
+# Workers: env ALPAGO_AGG_WORKERS or "aggregation_workers" in settings.json
+# (default: all cores; 1 turns the pool off).
+import os, atexit, threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import anomalies
+from utils.appdata import load_json
+
+PARALLEL_MIN = 200_000   # below this the pool's start-up and pickling cost more than it saves
+CHUNK_MIN = 50_000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def workers():
+    raw = os.getenv("ALPAGO_AGG_WORKERS") or load_json("settings.json").get("aggregation_workers")
+    try:
+        n = int(raw) if raw else 0
+    except (TypeError, ValueError):
+        n = 0
+    return max(1, n or os.cpu_count() or 1)
+
+def _to_date(s):
+    if not s: return None
+    s = str(s)[:10]
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d"):
+        try: return datetime.strptime(s, fmt).date()
+        except: pass
+    return None
+
+def _to_time(ts):
+    """(HH:MM, seconds of the day or None)."""
+    if not ts: return None, None
+    s = str(ts)
+    if len(s) >= 19 and s[10] in " T" and s[13] == s[16] == ":":  # the usual layout, without strptime
+        try:
+            h, m, sec = int(s[11:13]), int(s[14:16]), int(s[17:19])
+            if h < 24 and m < 60 and sec < 60:
+                return s[11:16], h * 3600 + m * 60 + sec
+        except ValueError:
+            pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%fZ",
+                "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            t = datetime.strptime(ts, fmt)
+            return t.strftime("%H:%M"), t.hour * 3600 + t.minute * 60 + t.second
+        except: pass
+    # last resort: slice
+    try: return str(ts)[11:16], None
+    except: return None, None
+
+def _to_hhmm(ts):
+    return _to_time(ts)[0]
+
+def group_chunk(triples, start_date=None, end_date=None, rules=None):
+    """
+    [(emp_code, stamp, terminal flag)] -> {(emp_code, day): [first, last, punches, flags, taps]}.
+    Runs in a worker.
+    """
+    s, e = _to_date(start_date), _to_date(end_date)
+    tap = (rules or {}).get("tap") or 0
+    out = {}
+    day_ok = {}  # the same few days repeat across thousands of punches
+    for code, stamp, flag in triples:
+        day = str(stamp)[:10]
+        ok = day_ok.get(day)
+        if ok is None:
+            d = _to_date(day)
+            ok = day_ok[day] = bool(d) and not ((s and d < s) or (e and d > e))
+        if not ok:
+            continue
+        hhmm, secs = _to_time(stamp)
+        if not hhmm:
+            continue
+        slot = out.get((code, day))
+        if slot is None:
+            slot = out[(code, day)] = [hhmm, hhmm, 0, 0, {}]
+        else:
+            if hhmm < slot[0]: slot[0] = hhmm
+            if hhmm > slot[1]: slot[1] = hhmm
+        slot[2] += 1
+        slot[3] |= flag | anomalies.tap_flag(slot[4], secs, tap)
+    return out
+
+def merge(into, part, rules=None):
+    """Fold one partial result into another (min first, max last, sum punches, or flags)."""
+    tap = (rules or {}).get("tap") or 0
+    for key, (first, last, n, flags, taps) in part.items():
+        slot = into.get(key)
+        if slot is None:
+            into[key] = [first, last, n, flags, taps]
+        else:
+            if first < slot[0]: slot[0] = first
+            if last > slot[1]: slot[1] = last
+            slot[2] += n
+            slot[3] |= flags | anomalies.merge_taps(slot[4], taps, tap)
+    return into
+
+def _get_pool(n):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=n)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+def fold(triples, start_date=None, end_date=None, rules=None):
+    """
+    [(emp_code, stamp, terminal flag)] -> {(emp_code, day): [first, last, punches, flags, taps]},
+    on the process pool for large inputs. flags do not include ODD yet (anomalies.finish).
+    """
+    n = workers()
+    if n <= 1 or len(triples) < PARALLEL_MIN:
+        return group_chunk(triples, start_date, end_date, rules)
+    size = max(CHUNK_MIN, -(-len(triples) // (n * 4)))
+    try:
+        pool = _get_pool(n)
+        futures = [pool.submit(group_chunk, triples[i:i + size], start_date, end_date, rules)
+                   for i in range(0, len(triples), size)]
+        grouped = {}
+        for fut in futures:
+            merge(grouped, fut.result(), rules)
+        return grouped
+    except Exception as e:
+        print("[WARN] parallel aggregation failed, grouping in-process:", e)
+        return group_chunk(triples, start_date, end_date, rules)
+
+def group(records, emp_code=None, start_date=None, end_date=None):
+    """
+    {(emp_code, day): {"first", "last", "punches", "flags"}} for records inside
+    the date window (and of emp_code, if given). flags is the utils.anomalies
+    bitmask of the day.
+    """
+    want = str(emp_code).strip() if emp_code is not None else None
+    rules = anomalies.rules()
+    triples = []
+    for r in records:
+        code = str(r.get("emp_code", "")).strip()
+        if want is not None and code != want:
+            continue
+        # pick the best timestamp field
+        stamp = r.get("punch_time") or r.get("upload_time")
+        if stamp:
+            triples.append((code, stamp,
+                            anomalies.terminal_flag(rules, r.get("terminal_sn"), r.get("terminal_alias"))))
+    grouped = fold(triples, start_date, end_date, rules)
+    return {k: {"first": f, "last": l, "punches": c, "flags": anomalies.finish(fl, c, rules)}
+            for k, (f, l, c, fl, _) in grouped.items()}
@@ -0,0 +1,77 @@
+# File: utils/anomalies.py
+# Data-quality flags for attendance days, raised inside the passes that
+# already group punches (utils.aggregate, utils.rollups.ingest, utils.shifts)
+# with O(1) extra work per punch:
+#   double tap           - two punches closer than double_tap_seconds
+#   odd punches          - an odd punch count (a missing in or out), from the final count
+#   unexpected terminal  - a punch from a terminal not in the expected list
+# Rules come from ANOMALY_RULES in config.py; 0 / False / [] turns a rule off.
+# Flags are a bitmask per (employee, day).
+import config
+
+DOUBLE_TAP, ODD, TERMINAL = 1, 2, 4
+NAMES = {DOUBLE_TAP: "double tap", ODD: "odd punches", TERMINAL: "unexpected terminal"}
+DEFAULTS = {"double_tap_seconds": 60, "odd_punches": True, "terminals": []}
+
+def rules():
+    """{"tap": seconds or 0, "odd": bool, "terminals": frozenset} from config (picklable for workers)."""
+    r = dict(DEFAULTS, **(getattr(config, "ANOMALY_RULES", None) or {}))
+    return {"tap": int(r.get("double_tap_seconds") or 0), "odd": bool(r.get("odd_punches")),
+            "terminals": frozenset(str(t).strip() for t in r.get("terminals") or [] if str(t).strip())}
+
+def enabled(r=None):
+    r = r or rules()
+    return bool(r["tap"] or r["odd"] or r["terminals"])
+
+def terminal_flag(r, *names):
+    """TERMINAL if an expected-terminal list is set and none of the punch's names (serial, alias) is on it."""
+    if not r["terminals"]:
+        return 0
+    names = [str(n).strip() for n in names if n]
+    return TERMINAL if names and not any(n in r["terminals"] for n in names) else 0
+
+def tap_flag(taps, seconds, window):
+    """
+    Record a punch (seconds of the day) in a slot's taps {bucket: [seconds]}
+    and return DOUBLE_TAP if another punch lies within `window` seconds.
+    Buckets are `window` wide, so only three are looked at whatever the order.
+    """
+    if not window or seconds is None:
+        return 0
+    b = seconds // window
+    hit = any(abs(seconds - s) < window for k in (b - 1, b, b + 1) for s in taps.get(k, ()))
+    taps.setdefault(b, []).append(seconds)
+    return DOUBLE_TAP if hit else 0
+
+def merge_taps(into, other, window):
+    """Fold one slot's taps into another's; DOUBLE_TAP if punches from both are too close."""
+    flag = 0
+    for bucket in other.values():
+        for s in bucket:
+            flag |= tap_flag(into, s, window)
+    return flag
+
+def finish(flags, punches, r):
+    """Final flags of a day once its punch count is known."""
+    return flags | (ODD if r["odd"] and punches % 2 else 0)
+
+def names(flags):
+    return ", ".join(NAMES[b] for b in (DOUBLE_TAP, ODD, TERMINAL) if flags & b)
+
+def summary(slots):
+    """{flag name: days} over report slots, and the number of flagged days."""
+    counts, flagged = {}, 0
+    for slot in slots:
+        f = slot.get("flags") or 0
+        if f:
+            flagged += 1
+        for b, n in NAMES.items():
+            if f & b:
+                counts[n] = counts.get(n, 0) + 1
+    return counts, flagged
+
+def summary_text(slots):
+    counts, flagged = summary(slots)
+    if not flagged:
+        return ""
+    return f"Data quality: {flagged} flagged day(s) - " + ", ".join(f"{n} {k}" for k, n in counts.items())
@@ -0,0 +1,270 @@
+# File: utils/api.py
+# Shared HTTP layer for the ZKBioTime API: one pooled session per server,
+# compressed responses, big pages and a fast JSON decoder. UI modules should
+# go through here instead of calling requests.get/post directly.
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from urllib.parse import urlsplit
+import threading
+import requests
+
+from utils import breaker, cache, governor, sites
+from utils.state import get_auth_headers
+from utils.appdata import load_json, save_json
+
+# Optional fast JSON decoder (orjson)
+try:
+    import orjson
+    HAVE_ORJSON = True
+except Exception:
+    HAVE_ORJSON = False
+
+DEFAULT_TIMEOUT = 25          # read timeout: the server may take a while to build a page
+CONNECT_TIMEOUT = 1.0         # a live host on the LAN/VPN accepts in well under a second
+MAX_PAGE_SIZE = 1000          # what we ask for; the server clamps to its own max
+PARALLEL_PAGES = 8            # page requests in flight for a concurrent scan (the governor still caps)
+WIRE_FILE = "wire.json"       # remembered page sizes / projection support
+
+# Only the fields the UI actually reads (terminal_alias too: ANOMALY_RULES may
+# list terminals by alias). Endpoints that ignore ?fields= are detected on the
+# first page and never sent it again.
+FIELDS = {
+    "/iclock/api/transactions/":   "id,emp,emp_code,first_name,last_name,punch_time,upload_time,"
+                                   "terminal_sn,terminal_alias,verify_type",
+    "/personnel/api/departments/": "id,dept_code,dept_name,parent_dept",
+    "/personnel/api/positions/":   "id,position_code,position_name",
+}
+
+# Errors that mean "server unreachable / too slow", as opposed to a server answer.
+NETWORK_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+class ApiError(Exception):
+    """Non-2xx answer from the server."""
+    def __init__(self, status, text=""):
+        super().__init__(f"HTTP {status} {text}".strip())
+        self.status = status
+        self.text = text
+
+_sessions = {}          # host:port -> requests.Session (one connection pool per server)
+_sessions_lock = threading.Lock()
+_foreground_hooks = []  # called when the UI thread starts a request (e.g. cancel prefetch)
+_wire = None  # {"page_size": {endpoint: n}, "no_fields": [endpoint, ...]}
+
+def session(url=None):
+    host = urlsplit(url or sites.base_url()).netloc
+    with _sessions_lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = requests.Session()  # keep-alive: one TCP/TLS handshake per host, not per call
+            s.headers["Accept-Encoding"] = "gzip, deflate"
+            _sessions[host] = s
+    return s
+
+def auth_headers(url):
+    """Token headers of the site that owns url."""
+    return get_auth_headers(sites.for_url(url))
+
+def _wire_settings():
+    global _wire
+    if _wire is None:
+        _wire = load_json(WIRE_FILE)
+        _wire.setdefault("page_size", {})
+        _wire.setdefault("no_fields", [])
+    return _wire
+
+def endpoint_of(url):
+    return urlsplit(url).path
+
+def page_size_for(endpoint):
+    return int(_wire_settings()["page_size"].get(endpoint, MAX_PAGE_SIZE))
+
+def _learn_page(endpoint, asked, rows, has_next):
+    """First page tells us the real max: a short page that still has a next link was clamped."""
+    wire = _wire_settings()
+    changed = False
+    if has_next and rows and 0 < len(rows) < asked:
+        wire["page_size"][endpoint] = len(rows)
+        changed = True
+    wanted = FIELDS.get(endpoint)
+    if wanted and rows and isinstance(rows[0], dict) and endpoint not in wire["no_fields"]:
+        if set(rows[0]) - set(wanted.split(",")):
+            wire["no_fields"].append(endpoint)  # server ignored the projection
+            changed = True
+    if changed:
+        proj = ("no" if endpoint in wire["no_fields"] else "yes") if wanted else "n/a"
+        print(f"[INFO] Wire settings for {endpoint}: page_size={page_size_for(endpoint)}, fields={proj}")
+        save_json(WIRE_FILE, wire)
+
+def decode(resp):
+    """resp.json(), but through orjson when it is installed."""
+    if not resp.content:
+        return {}
+    if HAVE_ORJSON:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+def on_foreground(fn):
+    _foreground_hooks.append(fn)
+
+def _foreground():
+    if threading.current_thread() is threading.main_thread():
+        for fn in _foreground_hooks:
+            fn()
+
+def timeouts(read=DEFAULT_TIMEOUT):
+    """(connect, read) for requests: a dead host fails in ~1 s, a slow page still gets `read`."""
+    return read if isinstance(read, tuple) else (CONNECT_TIMEOUT, read)
+
+def _send(url, send, timeout, priority, page_size=None):
+    """One request through the circuit breaker and the concurrency governor."""
+    breaker.before(url)  # raises CircuitOpen at once while the host is down
+    try:
+        resp = governor.call(endpoint_of(url), lambda: send(timeouts(timeout)), priority, page_size)
+    except requests.exceptions.RequestException as e:
+        breaker.failure(url, e.__class__.__name__)
+        raise
+    except BaseException:
+        # not the host's fault (bad URL, bug, Ctrl+C); only free a half-open probe
+        breaker.abort(url)
+        raise
+    breaker.record(url, resp.status_code)
+    return resp
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, priority=None, fresh=False):
+    """GET through the shared response cache; fresh=True ignores a cached copy."""
+    _foreground()
+    return cache.fetch(url, params, lambda: _send(url, lambda t: session(url).get(
+        url, headers=headers or auth_headers(url), params=params, timeout=t), timeout, priority,
+        (params or {}).get("page_size")), fresh)
+
+def post(url, json=None, headers=None, timeout=DEFAULT_TIMEOUT, priority=None):
+    _foreground()
+    return _send(url, lambda t: session(url).post(
+        url, headers=headers or auth_headers(url), json=json, timeout=t), timeout, priority)
+
+def wire_params(url, params=None):
+    """Add page_size (and ?fields= where supported) to a list request."""
+    endpoint = endpoint_of(url)
+    out = dict(params or {})
+    out.setdefault("page_size", page_size_for(endpoint))
+    if endpoint in FIELDS and endpoint not in _wire_settings()["no_fields"]:
+        out.setdefault("fields", FIELDS[endpoint])
+    return out
+
+def iter_pages(url, params=None, timeout=DEFAULT_TIMEOUT):
+    """Yield the row list of each page, following ?next links. Raises ApiError on a non-200."""
+    endpoint = endpoint_of(url)
+    params = wire_params(url, params)
+    headers = auth_headers(url)
+    next_url, first = url, True
+    while next_url:
+        r = get(next_url, headers=headers,
+                params=(params if ('?' not in next_url) else None), timeout=timeout)
+        if r.status_code != 200:
+            raise ApiError(r.status_code, r.text[:200])
+        payload = decode(r) or {}
+        if isinstance(payload, list):
+            yield payload
+            break
+        chunk = payload.get("data") or payload.get("results")
+        rows = chunk if isinstance(chunk, list) else []
+        next_url = payload.get("next")
+        if first:
+            _learn_page(endpoint, int(params["page_size"]), rows, bool(next_url))
+            first = False
+        yield rows
+
+def fetch_page(url, page, params=None, timeout=DEFAULT_TIMEOUT, fresh=False):
+    """One page by number: (rows, count, has_next). count is None if the server omits it."""
+    endpoint = endpoint_of(url)
+    q = wire_params(url, params)
+    q["page"] = page
+    r = get(url, params=q, timeout=timeout, fresh=fresh)
+    if r.status_code != 200:
+        raise ApiError(r.status_code, r.text[:200])
+    payload = decode(r) or {}
+    if isinstance(payload, list):
+        return payload, len(payload), False
+    chunk = payload.get("data") or payload.get("results")
+    rows = chunk if isinstance(chunk, list) else []
+    if page == 1:
+        _learn_page(endpoint, int(q["page_size"]), rows, bool(payload.get("next")))
+    return rows, payload.get("count"), bool(payload.get("next"))
+
+def iter_pages_parallel(url, params=None, timeout=DEFAULT_TIMEOUT, workers=PARALLEL_PAGES):
+    """
+    Like iter_pages, but page 1's count is used to request the remaining pages
+    concurrently; pages are yielded as they arrive (not in order). At most
+    `workers` pages are held at once, so memory stays flat on any size of
+    list. Falls back to following the pages one by one when the server gives no count.
+    """
+    rows, count, has_next = fetch_page(url, 1, params, timeout)
+    yield rows
+    if not has_next:
+        return
+    size = len(rows)
+    q = dict(params or {}, page_size=size)
+    if not count or not size:
+        n = 2
+        while has_next:
+            rows, _, has_next = fetch_page(url, n, q, timeout)
+            yield rows
+            n += 1
+        return
+    pages = -(-int(count) // size)
+    prio = governor.priority_for(None)  # workers keep the caller's priority
+
+    def one(n):
+        governor.set_priority(prio)
+        return fetch_page(url, n, q, timeout)[0]
+
+    todo = iter(range(2, pages + 1))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, pages - 1))) as pool:
+        pending = {pool.submit(one, n) for n in islice(todo, workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                n = next(todo, None)
+                if n is not None:
+                    pending.add(pool.submit(one, n))
+                yield fut.result()
+
+def paginate(url, params=None, timeout=DEFAULT_TIMEOUT):
+    """Collect all rows across pages; on error returns what was fetched so far."""
+    items = []
+    try:
+        for rows in iter_pages(url, params, timeout):
+            items.extend(rows)
+    except Exception as e:
+        print("[ERROR] pagination:", e)
+    return items
+
+def fan_out(fn, names=None):
+    """
+    Run fn(site_name) for every selected site in parallel, so the wait is the
+    slowest site rather than the sum. Returns {site: (result, error)}.
+    """
+    names = list(names or sites.selected())
+    _foreground()  # counts as a UI request even though the calls run on workers
+    out = {}
+    if len(names) == 1:
+        try:
+            out[names[0]] = (fn(names[0]), None)
+        except Exception as e:
+            out[names[0]] = (None, e)
+        return out
+    prio = governor.priority_for(None)  # workers keep the caller's priority
+
+    def run(n):
+        governor.set_priority(prio)
+        return fn(n)
+
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        futures = {n: pool.submit(run, n) for n in names}
+        for n, fut in futures.items():
+            try:
+                out[n] = (fut.result(), None)
+            except Exception as e:
+                print(f"[WARN] {n}: {e}")
+                out[n] = (None, e)
+    return out
@@ -0,0 +1,30 @@
+# File: utils/appdata.py
+import os, json
+
+def appdata_dir(*parts):
+    """%APPDATA%/ALPAGO (or ~/ALPAGO), plus optional sub-folders; created on demand."""
+    root = os.getenv("APPDATA") or os.path.expanduser("~")
+    path = os.path.join(root, "ALPAGO", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def load_json(name, default=None):
+    path = os.path.join(appdata_dir(), name)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {} if default is None else default
+
+def save_json(name, data):
+    # write to a temp file first so a crash never leaves half a file behind
+    path = os.path.join(appdata_dir(), name)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[WARN] Could not save {name}:", e)
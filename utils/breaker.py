@@ -0,0 +1,89 @@
+# File: utils/breaker.py
+# Circuit breaker per server (host:port). After FAIL_THRESHOLD consecutive
+# timeouts / connection errors / 5xx the circuit opens: calls to that host
+# fail at once with CircuitOpen instead of each waiting out its timeout.
+# After a cool-down exactly one call is let through as a probe (half-open);
+# success closes the circuit, failure re-opens it with a longer cool-down.
+# CircuitOpen is a ConnectionError, so callers' "server unreachable"
+# handling (outbox queue, stale copies) applies unchanged.
+import time, threading
+from urllib.parse import urlsplit
+
+import requests
+
+FAIL_THRESHOLD = 3
+COOLDOWN = 5.0         # first wait before a probe (s)
+COOLDOWN_MAX = 60.0    # doubles per failed probe up to this
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """The server is known to be down; the call was not sent."""
+
+_lock = threading.Lock()
+_hosts = {}   # host -> {"state", "fails", "opened_at", "cooldown", "last_error"}
+
+def _host(url):
+    return urlsplit(url).netloc
+
+def _entry(host):
+    return _hosts.setdefault(host, {"state": CLOSED, "fails": 0, "opened_at": 0.0,
+                                    "cooldown": COOLDOWN, "last_error": ""})
+
+def before(url):
+    """Raise CircuitOpen unless a call to url may go out now (maybe as the probe)."""
+    host = _host(url)
+    with _lock:
+        b = _entry(host)
+        if b["state"] == CLOSED:
+            return
+        wait = b["opened_at"] + b["cooldown"] - time.time()
+        if b["state"] == OPEN and wait <= 0:
+            b["state"] = HALF_OPEN  # this caller is the single probe
+            print(f"[BREAKER] {host}: probing")
+            return
+        msg = f"{host} is unreachable ({b['last_error']}); "
+        msg += f"retrying in {max(0, wait):.0f}s" if b["state"] == OPEN else "checking now"
+        raise CircuitOpen(msg)
+
+def success(url):
+    host = _host(url)
+    with _lock:
+        b = _entry(host)
+        if b["state"] != CLOSED:
+            print(f"[BREAKER] {host}: recovered")
+        b.update(state=CLOSED, fails=0, cooldown=COOLDOWN, last_error="")
+
+def failure(url, reason):
+    host = _host(url)
+    with _lock:
+        b = _entry(host)
+        b["fails"] += 1
+        b["last_error"] = reason
+        if b["state"] == HALF_OPEN:
+            b["cooldown"] = min(COOLDOWN_MAX, b["cooldown"] * 2)
+        elif b["state"] == CLOSED and b["fails"] < FAIL_THRESHOLD:
+            return
+        b["state"], b["opened_at"] = OPEN, time.time()
+        print(f"[BREAKER] {host}: open for {b['cooldown']:.0f}s after {reason}")
+
+def abort(url):
+    """A call ended in an error that says nothing about the host: hand a probe back, change nothing else."""
+    with _lock:
+        b = _entry(_host(url))
+        if b["state"] == HALF_OPEN:
+            b["state"] = OPEN  # cool-down already over: the next call probes
+
+def record(url, status):
+    """Feed one server answer: 5xx counts as a failure, anything else as success."""
+    if status >= 500:
+        failure(url, f"HTTP {status}")
+    else:
+        success(url)
+
+def status():
+    """{host: (state, seconds until the next probe, last error)} for hosts not closed."""
+    now = time.time()
+    with _lock:
+        return {h: (b["state"], max(0.0, b["opened_at"] + b["cooldown"] - now), b["last_error"])
+                for h, b in _hosts.items() if b["state"] != CLOSED}
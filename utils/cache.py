@@ -0,0 +1,111 @@
+# File: utils/cache.py
+# Short-lived in-memory cache of GET responses, shared by every open window.
+# Entries live for a per-endpoint TTL and the whole cache is kept under
+# MAX_BYTES (least recently used go first). Identical requests that are
+# already on the wire are not sent twice: later callers wait for the first
+# one and get the same response. POSTs that create data call invalidate().
+import time, threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+MAX_BYTES = 32 * 1024 * 1024
+MAX_ENTRY = MAX_BYTES // 4   # a huge page is not worth evicting everything else for
+
+# Seconds a response stays valid; endpoints not listed are never cached
+TTL = {
+    "/personnel/api/employees/":   60,
+    "/personnel/api/departments/": 300,
+    "/personnel/api/positions/":   300,
+    "/iclock/api/transactions/":   60,
+    "/iclock/api/terminals/":      30,
+}
+
+_lock = threading.Lock()
+_entries = OrderedDict()     # key -> (response, stored_at, size)
+_inflight = {}               # key -> {"done": Event, "resp": ..., "error": ...}
+_bytes = 0
+_generation = 0              # bumped by invalidate(); stops in-flight results landing after it
+_stats = {"hits": 0, "misses": 0, "shared": 0, "evicted": 0}
+
+def key_for(url, params=None):
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return url, tuple(items)
+
+def ttl_for(url):
+    return TTL.get(urlsplit(url).path, 0)
+
+def _drop(key):
+    global _bytes
+    entry = _entries.pop(key, None)
+    if entry:
+        _bytes -= entry[2]
+
+def _store(key, resp, generation):
+    global _bytes
+    size = len(resp.content) + 256
+    if size > MAX_ENTRY:
+        return
+    with _lock:
+        if generation != _generation:
+            return
+        _drop(key)
+        _entries[key] = (resp, time.time(), size)
+        _bytes += size
+        while _bytes > MAX_BYTES and _entries:
+            _drop(next(iter(_entries)))
+            _stats["evicted"] += 1
+
+def fetch(url, params, loader, fresh=False):
+    """
+    Cached loader() for GET url+params. fresh=True skips a cached copy (but
+    still joins an identical request in flight and refreshes the entry).
+    """
+    ttl = ttl_for(url)
+    if ttl <= 0:
+        return loader()
+    key = key_for(url, params)
+    with _lock:
+        hit = None if fresh else _entries.get(key)
+        if hit and time.time() - hit[1] <= ttl:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return hit[0]
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = {"done": threading.Event(), "resp": None, "error": None}
+            _stats["misses"] += 1
+        else:
+            _stats["shared"] += 1
+        generation = _generation
+    if not leader:
+        flight["done"].wait()
+        if flight["error"] is not None:
+            raise flight["error"]
+        return flight["resp"]
+    try:
+        resp = loader()
+        flight["resp"] = resp
+        if resp.status_code == 200:
+            _store(key, resp, generation)
+        return resp
+    except Exception as e:
+        flight["error"] = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        flight["done"].set()
+
+def invalidate(url=None):
+    """Forget cached responses for url's endpoint (any host), or everything."""
+    global _generation
+    path = urlsplit(url).path if url else None
+    with _lock:
+        _generation += 1
+        for key in [k for k in _entries if path is None or urlsplit(k[0]).path == path]:
+            _drop(key)
+
+def stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), bytes=_bytes)
@@ -0,0 +1,134 @@
+# File: utils/columnar.py
+# Columnar export of the local attendance store (utils.rollups) for payroll/BI:
+# raw punches and daily summaries as Parquet (default) or Arrow IPC files,
+# partitioned by month so readers can skip the months they don't need:
+#
+#   <root>/raw_punches/month=2025-01/<site>.parquet
+#   <root>/daily_summary/month=2025-01/<site>.parquet
+#
+# Exporting part of a month replaces only those days in the month's file;
+# days already exported from the rest of the month are kept.
+#
+# Text columns with few distinct values (site, emp_code, terminal, verify
+# type) are dictionary-encoded; times are real timestamp columns.
+# Format: "columnar_format": "parquet" | "arrow" in settings.json.
+import os, re
+from datetime import datetime, timedelta
+
+from utils import rollups
+from utils.appdata import load_json
+
+# Optional dependency (pyarrow)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+    HAVE_ARROW = True
+except Exception:
+    HAVE_ARROW = False
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def export_format():
+    fmt = str(load_json("settings.json").get("columnar_format") or "parquet").lower()
+    return fmt if fmt in FORMATS else "parquet"
+
+def _months(start_date, end_date):
+    """[(YYYY-MM, first day, last day)] clipped to the window."""
+    d = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    out = []
+    while d <= end:
+        nxt = (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+        last = min(end, nxt - timedelta(days=1))
+        out.append((d.strftime("%Y-%m"), d.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")))
+        d = nxt
+    return out
+
+def _ts(stamp):
+    try:
+        return datetime.strptime(stamp[:19], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return datetime.strptime(stamp[:16], "%Y-%m-%d %H:%M")
+
+def _dict_col(values):
+    return pa.array(values, pa.string()).dictionary_encode()
+
+def _raw_table(site_name, rows):
+    ids, codes, stamps, terminals, verifies = zip(*rows)
+    return pa.table({
+        "site":        _dict_col([site_name] * len(rows)),
+        "emp_code":    _dict_col(codes),
+        "punch_time":  pa.array([_ts(s) for s in stamps], pa.timestamp("s")),
+        "day":         pa.array([_ts(s).date() for s in stamps], pa.date32()),
+        "terminal":    _dict_col(terminals),
+        "verify_type": _dict_col(verifies),
+        "id":          pa.array(ids, pa.string()),
+    })
+
+def _daily_table(site_name, rows):
+    codes, days, firsts, lasts, counts = zip(*rows)
+    return pa.table({
+        "site":        _dict_col([site_name] * len(rows)),
+        "emp_code":    _dict_col(codes),
+        "day":         pa.array([datetime.strptime(d, "%Y-%m-%d").date() for d in days], pa.date32()),
+        "first_punch": pa.array([_ts(f"{d} {t}") if t else None for d, t in zip(days, firsts)], pa.timestamp("s")),
+        "last_punch":  pa.array([_ts(f"{d} {t}") if t else None for d, t in zip(days, lasts)], pa.timestamp("s")),
+        "punches":     pa.array(counts, pa.int32()),
+    })
+
+def _read(path, fmt):
+    return feather.read_table(path) if fmt == "arrow" else pq.read_table(path)
+
+def _merged(table, path, fmt, a, b):
+    """table plus the rows of an existing partition file whose day is outside [a, b]."""
+    if not os.path.exists(path):
+        return table
+    try:
+        old = _read(path, fmt)
+        lo = datetime.strptime(a, "%Y-%m-%d").date()
+        hi = datetime.strptime(b, "%Y-%m-%d").date()
+        keep = [i for i, d in enumerate(old.column("day").to_pylist()) if not lo <= d <= hi]
+        if not keep:
+            return table
+        old = old.take(pa.array(keep, pa.int64())).select(table.column_names).cast(table.schema)
+        return pa.concat_tables([old, table]).sort_by("day")
+    except Exception as e:
+        print(f"[WARN] Could not merge with {path}, overwriting it:", e)
+        return table
+
+def _write(table, path, fmt):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    if fmt == "arrow":
+        feather.write_feather(table, tmp, compression="lz4")  # Arrow IPC file
+    else:
+        pq.write_table(table, tmp, compression="snappy", use_dictionary=True)
+    os.replace(tmp, path)
+
+def export(root, site_keys, start_date, end_date, fmt=None):
+    """
+    Write both tables for every {site name: site key} over the window.
+    Returns {"files", "raw", "daily"} counts. Raises RuntimeError without pyarrow.
+    """
+    if not HAVE_ARROW:
+        raise RuntimeError("pyarrow is not installed (pip install pyarrow)")
+    fmt = fmt or export_format()
+    ext = FORMATS[fmt]
+    done = {"files": 0, "raw": 0, "daily": 0}
+    for name, key in site_keys.items():
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "site"
+        for month, a, b in _months(start_date, end_date):
+            raw = rollups.punches(key, a, b)
+            if raw:
+                path = os.path.join(root, "raw_punches", f"month={month}", slug + ext)
+                _write(_merged(_raw_table(name, raw), path, fmt, a, b), path, fmt)
+                done["files"] += 1; done["raw"] += len(raw)
+            daily = rollups.summaries(key, a, b)
+            if daily:
+                path = os.path.join(root, "daily_summary", f"month={month}", slug + ext)
+                _write(_merged(_daily_table(name, daily), path, fmt, a, b), path, fmt)
+                done["files"] += 1; done["daily"] += len(daily)
+    print(f"[INFO] Columnar export ({fmt}): {done['raw']} punches, {done['daily']} daily rows, "
+          f"{done['files']} files -> {root}")
+    return done
@@ -0,0 +1,96 @@
+# File: utils/departments.py
+# Department hierarchy (parent_dept) with a precomputed Euler-tour index.
+# One depth-first walk numbers every department in preorder (tin) and
+# records the last number inside its subtree (tout), so:
+#   - "a is an ancestor of d"  is  tin[a] <= tin[d] <= tout[a]       O(1)
+#   - the descendants of a     are order[tin[a] : tout[a] + 1]        one slice
+#   - totals per subtree       come from prefix sums over preorder    O(n) once
+# Per-employee daily summaries are added to their own department in one
+# pass, then rolled up to every ancestor with the prefix sums.
+from utils import prefetch
+
+def build(rows):
+    """
+    Tree index from [{"id", "name", "parent"}]. Departments whose parent is
+    missing (or part of a cycle) become roots. Siblings are ordered by name.
+    """
+    name = {r["id"]: r["name"] for r in rows}
+    parent = {r["id"]: r["parent"] if r["parent"] in name and r["parent"] != r["id"] else None
+              for r in rows}
+    children = {d: [] for d in name}
+    for d, p in parent.items():
+        if p is not None:
+            children[p].append(d)
+    by_name = lambda d: (str(name[d]).lower(), str(d))
+    for kids in children.values():
+        kids.sort(key=by_name)
+
+    order, tin, tout, depth = [], {}, {}, {}
+
+    def walk(root):
+        stack = [(root, 0, False)]
+        while stack:
+            d, level, done = stack.pop()
+            if done:
+                tout[d] = len(order) - 1
+                continue
+            tin[d], depth[d] = len(order), level
+            order.append(d)
+            stack.append((d, level, True))
+            stack.extend((c, level + 1, False) for c in reversed(children[d]))
+
+    for root in sorted((d for d, p in parent.items() if p is None), key=by_name):
+        walk(root)
+    # anything not reached sits on a parent cycle: cut it loose as a root
+    for d in sorted((d for d in name if d not in tin), key=by_name):
+        if d not in tin:
+            children[parent[d]].remove(d)
+            parent[d] = None
+            walk(d)
+    return {"name": name, "parent": parent, "children": children, "key": {str(d): d for d in name},
+            "order": order, "tin": tin, "tout": tout, "depth": depth}
+
+def load():
+    """(tree, stale_since) for the primary site's departments (prefetched after login)."""
+    rows, stale = prefetch.get("dept_tree")
+    return build(rows or []), stale
+
+def find(tree, dept_id):
+    """The tree's key for an id as the API gives it (int or string), or None."""
+    if dept_id in tree["tin"]:
+        return dept_id
+    return tree["key"].get(str(dept_id))
+
+def is_ancestor(tree, a, d):
+    """True if a is d or one of its ancestors."""
+    return tree["tin"][a] <= tree["tin"][d] <= tree["tout"][a]
+
+def subtree(tree, a):
+    """a and all its descendants, in preorder."""
+    return tree["order"][tree["tin"][a]: tree["tout"][a] + 1]
+
+def ancestors(tree, d):
+    """d's ancestors, nearest first."""
+    out, p = [], tree["parent"][d]
+    while p is not None:
+        out.append(p)
+        p = tree["parent"][p]
+    return out
+
+def label(tree, d, indent="    "):
+    """Department name indented by depth, for pickers and reports."""
+    return indent * tree["depth"][d] + str(tree["name"][d])
+
+def rollup(tree, own, width):
+    """
+    {dept: [totals of the dept and all its descendants]} from own
+    {dept: [width numbers]} (departments missing from own count as zeros).
+    """
+    order = tree["order"]
+    prefix = [[0] * width]
+    for d in order:
+        vals = own.get(d)
+        prev = prefix[-1]
+        prefix.append([a + b for a, b in zip(prev, vals)] if vals else prev)
+    return {d: [b - a for a, b in zip(prefix[tree["tin"][d]], prefix[tree["tout"][d] + 1])]
+            for d in order}
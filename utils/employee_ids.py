@@ -0,0 +1,94 @@
+# File: utils/employee_ids.py
+# emp_code -> internal employee id (what id-based server filters such as
+# ?emp=<id> expect). Ids never change for a code, so answers are kept per
+# site in %APPDATA%/ALPAGO/employee_ids.json. Sources, cheapest first: that
+# file, the prefetched directory, then /personnel/api/employees/ - one lookup
+# for a single code, one paged scan (id/emp_code only) for a batch.
+import threading
+
+from utils import api, prefetch, sites
+from utils.appdata import load_json, save_json
+
+IDS_FILE = "employee_ids.json"
+SCAN_FIELDS = "id,emp_code"
+
+_lock = threading.Lock()
+_ids = None   # {site base URL: {emp_code: id}}
+
+def _table(key):
+    global _ids
+    if _ids is None:
+        _ids = load_json(IDS_FILE)
+    return _ids.setdefault(key, {})
+
+def _remember(key, found):
+    if not found:
+        return
+    with _lock:
+        _table(key).update(found)
+        save_json(IDS_FILE, _ids)
+
+def _pairs(rows):
+    out = {}
+    for emp in rows or []:
+        code, eid = str(emp.get("emp_code", "")).strip(), emp.get("id")
+        if code and eid is not None:
+            out[code] = eid
+    return out
+
+def _from_directory(key, codes):
+    if key != sites.base_url():
+        return {}
+    directory = prefetch.peek("employees") or {}
+    return _pairs(directory[c] for c in codes if c in directory)
+
+def cached(code, site=None):
+    with _lock:
+        return _table(sites.base_url(site)).get(str(code).strip())
+
+def resolve(code, site=None):
+    """Internal id for emp_code on a site (primary by default), or None if unknown."""
+    code = str(code).strip()
+    eid = cached(code, site)
+    if eid is not None:
+        return eid
+    key = sites.base_url(site)
+    found = _from_directory(key, [code])
+    if code not in found:
+        url = f"{key}/personnel/api/employees/"
+        resp = api.get(url, params={"emp_code": code, "fields": SCAN_FIELDS}, timeout=20)
+        if resp.status_code != 200:
+            raise api.ApiError(resp.status_code, resp.text[:200])
+        payload = api.decode(resp) or {}
+        rows = payload if isinstance(payload, list) else (payload.get("data") or payload.get("results") or [])
+        found = {c: i for c, i in _pairs(rows).items() if c == code}
+        if code not in found and rows:
+            # filter ignored (other codes came back): scan the directory once
+            return resolve_many([code], site).get(code)
+    _remember(key, found)
+    return found.get(code)
+
+def resolve_many(codes, site=None):
+    """
+    {emp_code: id} for a batch (department reports): cached codes cost nothing,
+    the rest come from one paged scan of the directory that stops once all are found.
+    """
+    key = sites.base_url(site)
+    want = {str(c).strip() for c in codes if str(c).strip()}
+    with _lock:
+        table = _table(key)
+        out = {c: table[c] for c in want if c in table}
+    missing = want - set(out)
+    found = _from_directory(key, missing)
+    missing -= set(found)
+    if missing:
+        for rows in api.iter_pages(f"{key}/personnel/api/employees/", {"fields": SCAN_FIELDS}):
+            for c, i in _pairs(rows).items():
+                if c in missing:
+                    found[c] = i
+                    missing.discard(c)
+            if not missing:
+                break
+    _remember(key, found)
+    out.update(found)
+    return out
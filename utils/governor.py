@@ -0,0 +1,142 @@
+# File: utils/governor.py
+# One concurrency limit for all traffic to the ZKBioTime servers (AIMD).
+# Every api.get/post takes a slot first. The limit grows by ~1 per round of
+# healthy answers and halves on 429/5xx, timeouts, or latency well above the
+# usual for that endpoint and page size (a one-record lookup is no yardstick
+# for a 1000-row page). Waiting calls are served by priority, so an interactive
+# lookup jumps ahead of background crawls (prefetch, outbox, reports).
+import time, heapq, itertools, threading
+
+import requests
+
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+# Default priority per endpoint when the calling thread doesn't say otherwise
+ENDPOINT_PRIORITY = {
+    "/personnel/api/employees/":   INTERACTIVE,
+    "/personnel/api/departments/": INTERACTIVE,
+    "/personnel/api/positions/":   INTERACTIVE,
+    "/iclock/api/transactions/":   NORMAL,
+}
+
+LIMIT_START = 4
+LIMIT_MIN = 1
+LIMIT_MAX = 32
+LATENCY_FACTOR = 3.0     # slower than 3x the endpoint's best recent latency = overload
+LATENCY_FLOOR = 0.5      # ...but never react to answers faster than this (s)
+DECREASE_COOLDOWN = 1.0  # at most one halving per second
+BASELINE_RESET = 120     # forget an endpoint's best latency after this long (s)
+
+_cond = threading.Condition()
+_limit = float(LIMIT_START)
+_in_flight = 0
+_waiting = []            # heap of (priority, seq)
+_seq = itertools.count()
+_last_decrease = 0.0
+_baseline = {}           # (endpoint, page_size) -> (best latency, since)
+_local = threading.local()
+_stats = {"ok": 0, "overload": 0, "errors": 0, "decreases": 0, "last_reason": ""}
+
+# ---- priority of the calling thread ----
+def set_priority(prio):
+    """Priority for every call made by this thread (e.g. BACKGROUND in a worker)."""
+    _local.prio = prio
+
+def thread_priority():
+    return getattr(_local, "prio", None)
+
+def priority_for(endpoint, prio=None):
+    if prio is not None:
+        return prio
+    mine = thread_priority()
+    if mine is not None:
+        return mine
+    if threading.current_thread() is threading.main_thread():
+        return INTERACTIVE  # the UI is waiting on it
+    return ENDPOINT_PRIORITY.get(endpoint, NORMAL)
+
+# ---- slots ----
+def acquire(prio):
+    global _in_flight
+    ticket = (prio, next(_seq))
+    with _cond:
+        heapq.heappush(_waiting, ticket)
+        while not (_waiting[0] == ticket and _in_flight < int(_limit)):
+            _cond.wait()
+        heapq.heappop(_waiting)
+        _in_flight += 1
+        _cond.notify_all()  # next in line may also fit
+
+def release():
+    global _in_flight
+    with _cond:
+        _in_flight -= 1
+        _cond.notify_all()
+
+def _decrease(reason):
+    """Halve the limit (caller holds _cond); returns the log line, or None in the cooldown."""
+    global _limit, _last_decrease
+    now = time.time()
+    if now - _last_decrease < DECREASE_COOLDOWN:
+        return None
+    _last_decrease = now
+    _limit = max(LIMIT_MIN, _limit / 2)
+    _stats["decreases"] += 1
+    _stats["last_reason"] = reason
+    return f"[GOVERNOR] {reason} -> limit {int(_limit)}"
+
+def _label(endpoint, page_size):
+    return f"{endpoint} (page_size {page_size})" if page_size else endpoint
+
+def observe(endpoint, latency, status=None, failed=False, page_size=None):
+    """Feed one finished call into the AIMD controller."""
+    global _limit
+    key, msg = (endpoint, page_size), None
+    with _cond:
+        now = time.time()
+        best, since = _baseline.get(key, (latency, now))
+        if latency < best or now - since > BASELINE_RESET:
+            best, since = latency, now
+        _baseline[key] = (best, since)
+        if failed:
+            _stats["errors"] += 1
+            msg = _decrease(f"{endpoint}: timeout/connection error")
+        elif status == 429 or (status or 0) >= 500:
+            _stats["overload"] += 1
+            msg = _decrease(f"{endpoint}: HTTP {status}")
+        elif latency > LATENCY_FLOOR and latency > LATENCY_FACTOR * best:
+            _stats["overload"] += 1
+            msg = _decrease(f"{_label(endpoint, page_size)}: {latency:.1f}s vs usual {best:.1f}s")
+        else:
+            _stats["ok"] += 1
+            _limit = min(LIMIT_MAX, _limit + 1.0 / _limit)  # ~ +1 per window of successes
+        _cond.notify_all()
+    if msg:
+        print(msg)
+
+def call(endpoint, fn, prio=None, page_size=None):
+    """Run fn() (one HTTP request) inside a slot; returns its response."""
+    acquire(priority_for(endpoint, prio))
+    t0 = time.perf_counter()
+    try:
+        resp = fn()
+    except requests.exceptions.RequestException:  # not bugs / bad arguments
+        observe(endpoint, time.perf_counter() - t0, failed=True, page_size=page_size)
+        raise
+    finally:
+        release()
+    observe(endpoint, time.perf_counter() - t0, status=getattr(resp, "status_code", None),
+            page_size=page_size)
+    return resp
+
+def stats():
+    """Snapshot for the diagnostics view."""
+    with _cond:
+        waiting = {}
+        for prio, _ in _waiting:
+            name = PRIORITY_NAMES.get(prio, str(prio))
+            waiting[name] = waiting.get(name, 0) + 1
+        return dict(_stats, limit=int(_limit), limit_exact=round(_limit, 2),
+                    in_flight=_in_flight, waiting=waiting,
+                    baseline={_label(*k): round(v[0], 3) for k, v in _baseline.items()})
@@ -0,0 +1,252 @@
+# File: utils/outbox.py
+# Durable write-behind queue for employee / position creation.
+# submit() appends one JSON line to %APPDATA%/ALPAGO/outbox.jsonl and returns;
+# a background thread pushes queued entries to the server in batches, retrying
+# with backoff while the server is down. Entries the server rejects for good
+# (4xx) are moved to outbox_failed.jsonl so nothing is lost silently.
+# A POST that failed on the network may still have been committed, so such an
+# entry is marked "uncertain" and its emp_code is looked up before it is sent
+# again; an employee the server already has counts as sent.
+# Writes always go to the primary site.
+import os, json, time, uuid, threading
+from datetime import datetime
+import requests
+
+from auth import login
+from utils import api, cache, governor, prefetch, sites
+from utils.appdata import appdata_dir, load_json
+from utils.state import get_token
+
+OUTBOX_PATH = os.path.join(appdata_dir(), "outbox.jsonl")
+FAILED_PATH = os.path.join(appdata_dir(), "outbox_failed.jsonl")
+BATCH = 20            # entries sent per flush round
+RETRY_BASE = 5        # seconds; doubles per failed attempt
+RETRY_MAX = 300
+IDLE_WAKE = 30        # re-check the queue at least this often
+
+_lock = threading.Lock()
+_pending = None       # ordered list of entries still to send
+_failed = 0
+_wake = threading.Event()
+_worker = None
+
+def offline_enabled():
+    """Write-behind for every submit: ALPAGO_OFFLINE=1 or "offline_mode": true in settings.json."""
+    env = os.getenv("ALPAGO_OFFLINE")
+    if env is not None:
+        return env.strip().lower() in ("1", "true", "yes", "on")
+    return bool(load_json("settings.json").get("offline_mode"))
+
+def _append(path, obj):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(obj) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def _load():
+    """Replay the journal: entry lines add, {"done": id} lines remove."""
+    global _pending, _failed
+    if _pending is not None:
+        return
+    entries = {}
+    try:
+        with open(OUTBOX_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except Exception:
+                    continue  # torn last line after a crash
+                if "done" in rec:
+                    entries.pop(rec["done"], None)
+                elif rec.get("id"):
+                    entries[rec["id"]] = rec
+    except FileNotFoundError:
+        pass
+    _pending = list(entries.values())
+    for e in _pending:
+        e.setdefault("attempts", 0)
+        e["next_try"] = 0
+    try:
+        with open(FAILED_PATH, "r", encoding="utf-8") as f:
+            _failed = sum(1 for _ in f)
+    except FileNotFoundError:
+        _failed = 0
+
+def _compact():
+    """Rewrite the journal with only what is still pending (called with _lock held)."""
+    tmp = OUTBOX_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for e in _pending:
+            f.write(json.dumps({k: v for k, v in e.items() if k != "next_try"}) + "\n")
+    os.replace(tmp, OUTBOX_PATH)
+
+def enqueue(kind, payload, uncertain=False):
+    """
+    Queue a write ("employee" or "position"); durable once this returns.
+    uncertain: a POST of it already failed on the network and may have gone through.
+    """
+    entry = {"id": uuid.uuid4().hex, "kind": kind, "payload": payload,
+             "queued_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "attempts": 0}
+    if uncertain:
+        entry["uncertain"] = True
+    with _lock:
+        _load()
+        _append(OUTBOX_PATH, entry)
+        entry["next_try"] = 0
+        _pending.append(entry)
+    start()
+    _wake.set()
+    return entry
+
+def pending_employee(emp_code):
+    """The queued payload for emp_code, if it has not reached the server yet."""
+    with _lock:
+        _load()
+        for e in _pending:
+            if e["kind"] == "employee" and str(e["payload"].get("emp_code")) == str(emp_code):
+                return e
+    return None
+
+def status():
+    """(pending, failed) counts for the UI."""
+    with _lock:
+        _load()
+        return len(_pending), _failed
+
+# ---- sending ----
+def _retryable(e):
+    if isinstance(e, requests.exceptions.RequestException):
+        return True
+    status = getattr(e, "status", None)
+    return status in (401, 408, 429) or (status or 0) >= 500
+
+def _check(resp):
+    if resp.status_code in (200, 201):
+        return api.decode(resp) or {}
+    raise api.ApiError(resp.status_code, resp.text[:300])
+
+def _ensure_position(name):
+    for rows in api.iter_pages(f"{sites.base_url()}/personnel/api/positions/"):
+        for pos in rows:
+            if pos.get("position_name") == name:
+                return pos.get("id")
+    url = f"{sites.base_url()}/personnel/api/positions/"
+    created = _check(api.post(url, timeout=20, json={
+        "position_code": name[:10] or "POS", "position_name": name, "parent_position": None}))
+    cache.invalidate(url)
+    prefetch.invalidate("positions")
+    return created.get("id")
+
+def _employee_exists(emp_code):
+    """True if the server already has emp_code (read fresh, never from the cache)."""
+    code = str(emp_code).strip()
+    resp = api.get(f"{sites.base_url()}/personnel/api/employees/",
+                   params={"emp_code": code, "fields": "id,emp_code"}, timeout=20, fresh=True)
+    if resp.status_code != 200:
+        raise api.ApiError(resp.status_code, resp.text[:200])
+    payload = api.decode(resp) or {}
+    rows = payload if isinstance(payload, list) else (payload.get("data") or payload.get("results") or [])
+    return any(str(r.get("emp_code", "")).strip() == code for r in rows)
+
+def _send(entry):
+    payload = dict(entry["payload"])
+    if entry["kind"] == "position":
+        _ensure_position(payload["position_name"])
+        return
+    url = f"{sites.base_url()}/personnel/api/employees/"
+    uncertain = entry.get("uncertain")
+    if uncertain and _employee_exists(payload.get("emp_code")):
+        print(f"[OUTBOX] employee {payload.get('emp_code')} was already created by an earlier attempt")
+    else:
+        pos_name = payload.pop("position_name", None)
+        if payload.get("position") is None and pos_name:
+            payload["position"] = _ensure_position(pos_name)
+        try:
+            _check(api.post(url, json=payload, timeout=25))
+        except api.ApiError as e:
+            # a duplicate after an unanswered attempt means that attempt went through
+            if not (uncertain and e.status in (400, 409) and "exist" in e.text.lower()):
+                raise
+            print(f"[OUTBOX] employee {payload.get('emp_code')} already exists: {e}")
+    cache.invalidate(url)
+    prefetch.invalidate("employees")
+
+def flush_once():
+    """Send up to BATCH due entries in queue order. Returns number sent."""
+    global _failed
+    with _lock:
+        _load()
+        now = time.time()
+        batch = [e for e in _pending if e["next_try"] <= now][:BATCH]
+    if not batch:
+        return 0
+    if not get_token() and not login():
+        _backoff(batch)  # server may have been down at startup
+        return 0
+    sent = 0
+    for entry in batch:
+        try:
+            _send(entry)
+            sent += 1
+        except Exception as e:
+            if _retryable(e):
+                print(f"[OUTBOX] {entry['kind']} {entry['id'][:8]} will retry: {e}")
+                if getattr(e, "status", None) == 401:
+                    login()
+                if isinstance(e, requests.exceptions.RequestException) and not entry.get("uncertain"):
+                    _mark_uncertain(entry)
+                _backoff([entry])
+                break  # server is struggling; keep queue order and wait
+            print(f"[OUTBOX] {entry['kind']} {entry['id'][:8]} rejected: {e}")
+            with _lock:
+                _append(FAILED_PATH, {k: v for k, v in entry.items() if k != "next_try"} | {"error": str(e)})
+                _failed += 1
+        _finish(entry)
+    return sent
+
+def _finish(entry):
+    with _lock:
+        _append(OUTBOX_PATH, {"done": entry["id"]})
+        _pending.remove(entry)
+        if not _pending:
+            _compact()
+
+def _mark_uncertain(entry):
+    """The request may have reached the server; re-journal the entry so a restart knows too."""
+    with _lock:
+        entry["uncertain"] = True
+        _append(OUTBOX_PATH, {k: v for k, v in entry.items() if k != "next_try"})
+
+def _backoff(entries):
+    with _lock:
+        for e in entries:
+            e["attempts"] = e.get("attempts", 0) + 1
+            e["next_try"] = time.time() + min(RETRY_MAX, RETRY_BASE * 2 ** (e["attempts"] - 1))
+
+def _next_wait():
+    with _lock:
+        _load()
+        if not _pending:
+            return IDLE_WAKE
+        due = min(e["next_try"] for e in _pending) - time.time()
+    return max(0.5, min(IDLE_WAKE, due))
+
+def _run():
+    governor.set_priority(governor.BACKGROUND)
+    while True:
+        _wake.wait(_next_wait())
+        _wake.clear()
+        try:
+            while flush_once():
+                pass
+        except Exception as e:
+            print("[OUTBOX] flush error:", e)
+
+def start():
+    """Start the background flusher (idempotent)."""
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="outbox", daemon=True)
+            _worker.start()
+    _wake.set()
@@ -0,0 +1,169 @@
+# File: utils/prefetch.py
+# Hot data kept in memory for the modules: departments, positions, the
+# employee directory and today's punches. start() loads them in a background
+# thread right after login so opening a module needs no network; any request
+# made from the UI thread cancels the rest of the prefetch so it never
+# competes with what the user is waiting for.
+import time, threading
+from datetime import datetime
+
+from utils import api, governor, sites, snapshot
+
+START_DELAY = 1.0     # let the menu paint first
+PAGE_PAUSE = 0.05     # breathe between pages (low priority)
+
+_lock = threading.Lock()
+_cache = {}           # name -> (data, fetched_at)
+_cancel = threading.Event()
+_worker = None
+
+class Cancelled(Exception):
+    pass
+
+def _pages(url, params=None, background=False):
+    for rows in api.iter_pages(url, params):
+        if background:
+            if _cancel.is_set():
+                raise Cancelled()
+            time.sleep(PAGE_PAUSE)
+        yield rows
+
+# ---- loaders: name -> fn(background) ----
+def _departments(background=False):
+    out = {}
+    for rows in _pages(f"{sites.base_url()}/personnel/api/departments/", background=background):
+        for dept in rows:
+            name, did = dept.get("dept_name"), dept.get("id")
+            if name and did is not None:
+                out[name] = did
+    return out
+
+def _department_tree(background=False):
+    """[{"id", "name", "parent"}] for utils.departments (same pages as _departments, served by the response cache)."""
+    out = []
+    for rows in _pages(f"{sites.base_url()}/personnel/api/departments/", background=background):
+        for dept in rows:
+            if dept.get("id") is None:
+                continue
+            parent = dept.get("parent_dept")
+            if isinstance(parent, dict):
+                parent = parent.get("id")
+            out.append({"id": dept["id"], "name": dept.get("dept_name") or str(dept["id"]), "parent": parent})
+    return out
+
+def _positions(background=False):
+    out = {}
+    for rows in _pages(f"{sites.base_url()}/personnel/api/positions/", background=background):
+        for pos in rows:
+            name, pid = pos.get("position_name"), pos.get("id")
+            if name and pid is not None:
+                out[name] = pid
+    return out
+
+def _employees(background=False):
+    out = {}
+    for rows in _pages(f"{sites.base_url()}/personnel/api/employees/", background=background):
+        for emp in rows:
+            code = str(emp.get("emp_code", "")).strip()
+            if code:
+                out[code] = emp
+    return out
+
+def _today_punches(background=False):
+    """Today's transactions, only if the server honours a date filter (never a full crawl)."""
+    day = datetime.now().strftime("%Y-%m-%d")
+    attempts = [
+        {"start_time": f"{day} 00:00:00", "end_time": f"{day} 23:59:59"},
+        {"start": day, "end": day},
+        {"date__gte": day, "date__lte": day},
+    ]
+    for params in attempts:
+        rows, honoured = [], True
+        for page in _pages(f"{sites.base_url()}/iclock/api/transactions/", params, background=background):
+            if any(str(r.get("punch_time") or r.get("upload_time") or "")[:10] != day for r in page):
+                honoured = False
+                break
+            rows.extend(page)
+        if honoured:
+            return {"day": day, "rows": rows}
+    return None
+
+LOADERS = {
+    # name: (loader, max age in seconds, keep a disk copy for offline use)
+    "departments": (_departments, 600, True),
+    "dept_tree":   (_department_tree, 600, True),
+    "positions":   (_positions, 600, True),
+    "employees":   (_employees, 300, False),
+    "punches":     (_today_punches, 120, False),
+}
+
+def peek(name):
+    """Cached data if still fresh, else None. Never touches the network."""
+    with _lock:
+        hit = _cache.get(name)
+    if hit and time.time() - hit[1] <= LOADERS[name][1]:
+        return hit[0]
+    return None
+
+def put(name, data):
+    with _lock:
+        _cache[name] = (data, time.time())
+
+def invalidate(name):
+    with _lock:
+        _cache.pop(name, None)
+
+def get(name):
+    """
+    Fresh cached data, else a live (foreground) load.
+    Returns (data, stale_since) like snapshot.cached: stale_since is None for live data.
+    """
+    data = peek(name)
+    if data is not None:
+        return data, None
+    loader, _, keep = LOADERS[name]
+    if keep:
+        data, stale = snapshot.cached(name, loader)
+    else:
+        data, stale = loader(), None
+    if stale is None and data is not None:
+        put(name, data)
+    return data, stale
+
+def cancel():
+    if _worker is not None and _worker.is_alive() and not _cancel.is_set():
+        print("[PREFETCH] foreground request - cancelling")
+        _cancel.set()
+
+def _run():
+    governor.set_priority(governor.BACKGROUND)
+    time.sleep(START_DELAY)
+    for name, (loader, _, keep) in LOADERS.items():
+        if _cancel.is_set():
+            return
+        if peek(name) is not None:
+            continue
+        t0 = time.time()
+        try:
+            data = loader(background=True)
+        except Cancelled:
+            return
+        except Exception as e:
+            print(f"[PREFETCH] {name} failed:", e)
+            continue
+        if data is None:
+            continue
+        put(name, data)
+        if keep:
+            snapshot.save(name, data)
+        print(f"[PREFETCH] {name} ready in {time.time() - t0:.1f}s")
+
+def start():
+    """Kick off the background prefetch once, right after login."""
+    global _worker
+    if _worker is not None:
+        return
+    _cancel.clear()
+    api.on_foreground(cancel)
+    _worker = threading.Thread(target=_run, name="prefetch", daemon=True)
+    _worker.start()
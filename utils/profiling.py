@@ -0,0 +1,130 @@
+# File: utils/profiling.py
+# Opt-in profiling of UI actions (module launches and Search/Check/Submit/Export).
+# Turn on with ALPAGO_PROFILE=1 or "profiling": true in settings.json. Each
+# action writes <time>_<action>.pstats (cProfile) and .mem.txt (tracemalloc
+# peak + top allocations) to %APPDATA%/ALPAGO/profiles, plus a line in index.jsonl.
+#
+#   python -m utils.profiling            # slowest recorded actions
+#   python -m utils.profiling <n|file>   # slowest functions of one action
+import os, re, io, sys, json, time, pstats, cProfile, tracemalloc, functools
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.appdata import appdata_dir, load_json
+
+TOP_FUNCS = 25
+TOP_ALLOCS = 15
+
+_active = False  # cProfile can't nest; inner actions run unprofiled
+
+def enabled():
+    env = os.getenv("ALPAGO_PROFILE")
+    if env is not None:
+        return env.strip().lower() in ("1", "true", "yes", "on")
+    return bool(load_json("settings.json").get("profiling"))
+
+def _profiles_dir():
+    return appdata_dir("profiles")
+
+def _flush_tk():
+    # include pending Tk geometry/redraw work in the measurement
+    tk = sys.modules.get("tkinter")  # never import Tk just for this
+    try:
+        if tk is not None and tk._default_root is not None:
+            tk._default_root.update_idletasks()
+    except Exception:
+        pass
+
+@contextmanager
+def action(name):
+    """Profile the enclosed block as one named action (no-op unless enabled)."""
+    global _active
+    if _active or not enabled():
+        yield
+        return
+    _active = True
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    prof.enable()
+    try:
+        yield
+        _flush_tk()
+    finally:
+        prof.disable()
+        wall = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        snap = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+        _active = False
+        _save(name, prof, wall, peak, snap)
+
+def profiled(name):
+    """Decorator form of action() for button callbacks."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with action(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def _save(name, prof, wall, peak, snap):
+    try:
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "action"
+        base = os.path.join(_profiles_dir(), f"{datetime.now():%Y%m%d-%H%M%S}_{slug}")
+        prof.dump_stats(base + ".pstats")
+        with open(base + ".mem.txt", "w", encoding="utf-8") as f:
+            f.write(f"action: {name}\nwall: {wall:.3f}s\npeak: {peak / 1024:.1f} KiB\n\n")
+            for stat in snap.statistics("lineno")[:TOP_ALLOCS]:
+                f.write(f"{stat}\n")
+        with open(os.path.join(_profiles_dir(), "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"action": name, "at": f"{datetime.now():%Y-%m-%d %H:%M:%S}",
+                                "wall": round(wall, 4), "peak_kb": round(peak / 1024, 1),
+                                "file": os.path.basename(base)}) + "\n")
+        print(f"[PROFILE] {name}: {wall:.3f}s, peak {peak / 1024:.0f} KiB -> {base}.pstats")
+    except Exception as e:
+        print("[WARN] Could not save profile:", e)
+
+# ---- viewer ----
+def _index():
+    try:
+        with open(os.path.join(_profiles_dir(), "index.jsonl"), "r", encoding="utf-8") as f:
+            return [json.loads(l) for l in f if l.strip()]
+    except FileNotFoundError:
+        return []
+
+def slowest_functions(pstats_path, limit=TOP_FUNCS):
+    """Text report: functions sorted by cumulative time."""
+    out = io.StringIO()
+    st = pstats.Stats(pstats_path, stream=out)
+    st.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows = _index()
+    if not argv:
+        if not rows:
+            print("No profiles recorded. Set ALPAGO_PROFILE=1 and use the app.")
+            return
+        print(f"{'#':>3}  {'Action':32}  {'When':19}  {'Wall s':>8}  {'Peak KiB':>9}")
+        ranked = sorted(enumerate(rows), key=lambda x: -x[1]["wall"])
+        for i, r in ranked[:40]:
+            print(f"{i:>3}  {r['action'][:32]:32}  {r['at']:19}  {r['wall']:8.3f}  {r['peak_kb']:9.1f}")
+        return
+    arg = argv[0]
+    base = os.path.join(_profiles_dir(), rows[int(arg)]["file"]) if arg.isdigit() else arg.rsplit(".", 1)[0]
+    try:
+        with open(base + ".mem.txt", "r", encoding="utf-8") as f:
+            print(f.read())
+    except FileNotFoundError:
+        pass
+    print(slowest_functions(base + ".pstats"))
+
+if __name__ == "__main__":
+    main()
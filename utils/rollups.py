@@ -0,0 +1,235 @@
+# File: utils/rollups.py
+# Daily attendance summary kept on disk (SQLite, %APPDATA%/ALPAGO/attendance.db).
+# Every transaction the app downloads is ingested once (deduplicated by id)
+# and folded into one row per (site, emp_code, day): first, last, punch count
+# (grouped by utils.aggregate, on all cores for large crawls)
+# and raw_offset, the rowid of the first raw punch stored for the day (the
+# first ingested, not necessarily the earliest). A late punch for a past day
+# only updates that one row. Days whose punches were fully downloaded are
+# recorded in `covered`, so reports over them read the summary instead of
+# the server. Coverage of a day downloaded less than SETTLE_DAYS after it
+# expires after RECENT_TTL, so punches uploaded late are still picked up.
+# `site` is the site's base URL (stable across renames).
+# Each row also carries the day's utils.anomalies flags, raised as punches are
+# ingested (odd counts are derived from `punches` when read).
+import os, sqlite3, threading
+from datetime import datetime, timedelta
+
+from utils import aggregate, anomalies
+from utils.appdata import appdata_dir
+
+DB_NAME = "attendance.db"
+SETTLE_DAYS = 3      # a day downloaded this long after it ended is final
+RECENT_TTL = 3600    # seconds a more recent day's coverage is trusted
+
+_lock = threading.Lock()
+_db = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS punches (
+    site TEXT NOT NULL, id TEXT NOT NULL,
+    emp_code TEXT NOT NULL, day TEXT NOT NULL, stamp TEXT NOT NULL,
+    terminal TEXT, verify TEXT,
+    PRIMARY KEY (site, id)
+);
+CREATE INDEX IF NOT EXISTS punches_emp_day ON punches (site, emp_code, day);
+CREATE INDEX IF NOT EXISTS punches_day ON punches (site, day);
+CREATE TABLE IF NOT EXISTS daily (
+    site TEXT NOT NULL, emp_code TEXT NOT NULL, day TEXT NOT NULL,
+    first TEXT, last TEXT, punches INTEGER NOT NULL, raw_offset INTEGER,
+    flags INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (site, emp_code, day)
+);
+CREATE INDEX IF NOT EXISTS daily_day ON daily (site, day);
+CREATE TABLE IF NOT EXISTS covered (
+    site TEXT NOT NULL, day TEXT NOT NULL, covered_at TEXT, PRIMARY KEY (site, day)
+);
+"""
+
+def _conn():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(os.path.join(appdata_dir(), DB_NAME), check_same_thread=False)
+        _db.executescript(SCHEMA)
+        # stores created before anomaly flags existed
+        if "flags" not in [c[1] for c in _db.execute("PRAGMA table_info(daily)")]:
+            _db.execute("ALTER TABLE daily ADD COLUMN flags INTEGER NOT NULL DEFAULT 0")
+        # ...and before coverage expired (rows without a time are read again once)
+        if "covered_at" not in [c[1] for c in _db.execute("PRAGMA table_info(covered)")]:
+            _db.execute("ALTER TABLE covered ADD COLUMN covered_at TEXT")
+    return _db
+
+def _stamp(r):
+    return str(r.get("punch_time") or r.get("upload_time") or "")[:19].replace("T", " ")
+
+def _text(v):
+    return "" if v is None else str(v)  # verify_type 0 (password) is not empty
+
+def _seconds(stamp):
+    return int(stamp[11:13]) * 3600 + int(stamp[14:16]) * 60 + int(stamp[17:19] or 0)
+
+def _slot(first, last, n, flags, r):
+    return {"first": first, "last": last, "punches": n, "flags": anomalies.finish(flags, n, r)}
+
+def _days(start_date, end_date):
+    d = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    while d <= end:
+        yield d.strftime("%Y-%m-%d")
+        d += timedelta(days=1)
+
+def ingest(site, records):
+    """
+    Fold downloaded transactions into the summary; already-seen ids are skipped.
+    The new punches are grouped per (emp_code, day) in one pass and each
+    day's row is updated once. Returns the number of new punches.
+    """
+    rules = anomalies.rules()
+    fresh, first_row = [], {}
+    with _lock:
+        db = _conn()
+        with db:
+            for r in records:
+                stamp = _stamp(r)
+                code = str(r.get("emp_code", "")).strip()
+                if len(stamp) < 16 or not code:
+                    continue
+                day = stamp[:10]
+                rid = r.get("id")
+                rid = str(rid) if rid is not None else f"{code}|{stamp}|{r.get('terminal_sn') or ''}"
+                cur = db.execute(
+                    "INSERT OR IGNORE INTO punches VALUES (?,?,?,?,?,?,?)",
+                    (site, rid, code, day, stamp,
+                     r.get("terminal_alias") or r.get("terminal_sn") or "", _text(r.get("verify_type"))))
+                if cur.rowcount != 1:
+                    continue
+                fresh.append((code, stamp, anomalies.terminal_flag(rules, r.get("terminal_sn"),
+                                                                   r.get("terminal_alias"))))
+                first_row.setdefault((code, day), cur.lastrowid)
+            for (code, day), (first, last, n, flags, _) in aggregate.fold(fresh, rules=rules).items():
+                if rules["tap"] and not flags & anomalies.DOUBLE_TAP:
+                    flags |= _stored_taps(db, site, code, day, rules["tap"])
+                db.execute(
+                    "INSERT INTO daily (site, emp_code, day, first, last, punches, raw_offset, flags) "
+                    "VALUES (?,?,?,?,?,?,?,?) "
+                    "ON CONFLICT (site, emp_code, day) DO UPDATE SET "
+                    "first = min(first, excluded.first), last = max(last, excluded.last), "
+                    "punches = punches + excluded.punches, raw_offset = min(raw_offset, excluded.raw_offset), "
+                    "flags = flags | excluded.flags",
+                    (site, code, day, first, last, n, first_row[(code, day)], flags))
+    return len(fresh)
+
+def _stored_taps(db, site, code, day, tap):
+    """
+    DOUBLE_TAP if a day that was already stored now has two punches within tap
+    seconds (new punches are in `punches` by now). One indexed read of the day.
+    """
+    if not db.execute("SELECT 1 FROM daily WHERE site = ? AND emp_code = ? AND day = ?",
+                      (site, code, day)).fetchone():
+        return 0  # a new day: fold() already checked all of its punches
+    prev = None
+    for (stamp,) in db.execute("SELECT stamp FROM punches WHERE site = ? AND emp_code = ? AND day = ? "
+                               "ORDER BY stamp", (site, code, day)):
+        try:
+            t = _seconds(stamp)
+        except ValueError:
+            continue
+        if prev is not None and t - prev < tap:
+            return anomalies.DOUBLE_TAP
+        prev = t
+    return 0
+
+def mark_covered(site, start_date, end_date):
+    """Record that every punch of these days was ingested (today is never final)."""
+    now = datetime.now()
+    today, stamp = now.strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d %H:%M:%S")
+    with _lock:
+        db = _conn()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO covered (site, day, covered_at) VALUES (?,?,?)",
+                           [(site, d, stamp) for d in _days(start_date, end_date) if d < today])
+
+def forget(site):
+    """Drop a site's coverage so its next reports are read from the server again."""
+    with _lock:
+        db = _conn()
+        with db:
+            db.execute("DELETE FROM covered WHERE site = ?", (site,))
+
+def is_covered(site, start_date, end_date):
+    want = list(_days(start_date, end_date))
+    with _lock:
+        # final (downloaded SETTLE_DAYS after the day) or downloaded within RECENT_TTL
+        have = _conn().execute(
+            "SELECT count(*) FROM covered WHERE site = ? AND day BETWEEN ? AND ? "
+            "AND (covered_at >= date(day, ?) OR covered_at >= ?)",
+            (site, start_date, end_date, f"+{SETTLE_DAYS} days",
+             (datetime.now() - timedelta(seconds=RECENT_TTL)).strftime("%Y-%m-%d %H:%M:%S"))).fetchone()[0]
+    return have == len(want)
+
+def days(site, emp_code, start_date, end_date):
+    """{day: {"first", "last", "punches", "flags"}} for one employee - same shape as _filter_and_group."""
+    r = anomalies.rules()
+    with _lock:
+        rows = _conn().execute(
+            "SELECT day, first, last, punches, flags FROM daily "
+            "WHERE site = ? AND emp_code = ? AND day BETWEEN ? AND ?",
+            (site, str(emp_code).strip(), start_date, end_date)).fetchall()
+    return {d: _slot(f, l, n, fl, r) for d, f, l, n, fl in rows}
+
+def employees(site, emp_codes, start_date, end_date):
+    """{emp_code: {day: slot}} for many employees (department reports), one query."""
+    codes = [str(c).strip() for c in emp_codes]
+    out = {c: {} for c in codes}
+    r = anomalies.rules()
+    with _lock:
+        db = _conn()
+        for i in range(0, len(codes), 500):  # stay under SQLite's variable limit
+            chunk = codes[i:i + 500]
+            rows = db.execute(
+                "SELECT emp_code, day, first, last, punches, flags FROM daily "
+                f"WHERE site = ? AND day BETWEEN ? AND ? AND emp_code IN ({','.join('?' * len(chunk))})",
+                [site, start_date, end_date] + chunk).fetchall()
+            for c, d, f, l, n, fl in rows:
+                out[c][d] = _slot(f, l, n, fl, r)
+    return out
+
+def punches(site, start_date, end_date):
+    """Raw punches of the window, oldest first: [(id, emp_code, stamp, terminal, verify)]."""
+    with _lock:
+        return _conn().execute(
+            "SELECT id, emp_code, stamp, terminal, verify FROM punches "
+            "WHERE site = ? AND day BETWEEN ? AND ? ORDER BY stamp",
+            (site, start_date, end_date)).fetchall()
+
+def employee_punches(site, emp_code, start_date, end_date):
+    """One employee's raw punches of the window as transaction-like dicts, oldest first."""
+    with _lock:
+        rows = _conn().execute(
+            "SELECT id, emp_code, stamp, terminal, verify FROM punches "
+            "WHERE site = ? AND emp_code = ? AND day BETWEEN ? AND ? ORDER BY stamp",
+            (site, str(emp_code).strip(), start_date, end_date)).fetchall()
+    return [{"id": i, "emp_code": c, "punch_time": s, "terminal_alias": t, "verify_type": v}
+            for i, c, s, t, v in rows]
+
+def last_punch_by_terminal(site, since_day):
+    """{terminal: newest stamp} over punches since since_day (terminal is alias or serial)."""
+    with _lock:
+        rows = _conn().execute(
+            "SELECT terminal, max(stamp) FROM punches WHERE site = ? AND day >= ? GROUP BY terminal",
+            (site, since_day)).fetchall()
+    return {t: s for t, s in rows if t}
+
+def summaries(site, start_date, end_date):
+    """Daily rows of the window: [(emp_code, day, first, last, punches)]."""
+    with _lock:
+        return _conn().execute(
+            "SELECT emp_code, day, first, last, punches FROM daily "
+            "WHERE site = ? AND day BETWEEN ? AND ? ORDER BY day, emp_code",
+            (site, start_date, end_date)).fetchall()
+
+def stats():
+    with _lock:
+        db = _conn()
+        return {t: db.execute(f"SELECT count(*) FROM {t}").fetchone()[0]
+                for t in ("punches", "daily", "covered")}
@@ -0,0 +1,154 @@
+# File: utils/shifts.py
+# Shift-aware pairing of punches. Each employee's punches are sorted once and
+# walked in a single pass: a punch either belongs to the shift instance that
+# is still open (up to its end + LATE_MIN, unless past the end it is nearer
+# the next shift's start) or opens the instance of the shift whose start is
+# nearest (it must fall between start - EARLY_MIN and end + LATE_MIN).
+# Punches of an instance alternate in/out, so split shifts keep every pair
+# and a night shift stays on the day it started.
+#
+# Shifts come from SHIFTS in config.py; with none configured every punch is
+# grouped by calendar day as before.
+from datetime import datetime, timedelta
+
+import config
+from utils import anomalies
+
+EARLY_MIN = 120    # earliest clock-in before the shift start (minutes)
+LATE_MIN = 240     # latest clock-out after the shift end (minutes)
+
+def configured():
+    """Shift definitions with parsed times: [{"name", "start", "length", "early", "late"}]."""
+    out = []
+    for s in getattr(config, "SHIFTS", None) or []:
+        start = datetime.strptime(s["start"], "%H:%M")
+        end = datetime.strptime(s["end"], "%H:%M")
+        length = (end - start) % timedelta(days=1) or timedelta(days=1)  # end <= start: overnight
+        out.append({"name": s.get("name") or s["start"], "start": start.time(), "length": length,
+                    "early": timedelta(minutes=s.get("early", EARLY_MIN)),
+                    "late": timedelta(minutes=s.get("late", LATE_MIN))})
+    return out
+
+def enabled():
+    return bool(getattr(config, "SHIFTS", None))
+
+def parse(stamp):
+    s = str(stamp or "")[:19].replace("T", " ")
+    try: return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+    except ValueError: pass
+    try: return datetime.strptime(s[:16], "%Y-%m-%d %H:%M")
+    except ValueError: return None
+
+def _opening(t, shifts):
+    """(start, end, until, name) of the shift instance a punch at t would open, or None."""
+    best = None
+    for sh in shifts:
+        for d in (t.date() - timedelta(days=1), t.date(), t.date() + timedelta(days=1)):
+            start = datetime.combine(d, sh["start"])
+            end = start + sh["length"]
+            if start - sh["early"] <= t <= end + sh["late"]:
+                dist = abs(t - start)
+                if best is None or dist < best[0]:
+                    best = (dist, start, end, end + sh["late"], sh["name"])
+    return best[1:] if best else None
+
+def instances(stamps, shifts=None):
+    """
+    Sorted-once, single-pass assignment of punch datetimes to shift instances:
+    [{"day", "shift", "punches": [datetime, ...]}], in time order.
+    """
+    shifts = configured() if shifts is None else shifts
+    out, cur = [], None
+    for t in sorted(stamps):
+        opening = None
+        if cur is not None and t <= cur["until"]:
+            if cur["shift"] and t <= cur["end"]:
+                cur["punches"].append(t)
+                continue
+            # past the end (or unscheduled): stay unless another shift's start is nearer
+            opening = _opening(t, shifts)
+            if opening is None or opening[0] == cur["start"] or \
+               (cur["shift"] and abs(t - opening[0]) >= t - cur["end"]):
+                cur["punches"].append(t)
+                continue
+        opening = opening or _opening(t, shifts)
+        if opening:
+            start, end, until, name = opening
+            cur = {"day": start.date(), "shift": name, "start": start, "end": end, "until": until, "punches": [t]}
+        else:
+            midnight = datetime.combine(t.date(), datetime.min.time())
+            end = midnight + timedelta(days=1, seconds=-1)
+            cur = {"day": t.date(), "shift": "", "start": midnight, "end": end, "until": end, "punches": [t]}
+        out.append(cur)
+    return out
+
+def _hhmm(t, day):
+    shift = (t.date() - day).days
+    return t.strftime("%H:%M") + (f"{shift:+d}" if shift else "")
+
+def _flags(p, rules, terminal):
+    """Anomaly flags of an instance's sorted punches (double taps are neighbours in time)."""
+    flags = 0
+    for i, t in enumerate(p):
+        flags |= terminal.get(t, 0)
+        if rules["tap"] and i and (t - p[i - 1]).total_seconds() < rules["tap"]:
+            flags |= anomalies.DOUBLE_TAP
+    return anomalies.finish(flags, len(p), rules)
+
+def describe(inst, rules=None, terminal=None):
+    """
+    Report slot for one instance: first/last (with +1 for the next day), in/out
+    pairs, worked minutes and anomaly flags (terminal: {datetime: flag}).
+    """
+    p, day = inst["punches"], inst["day"]
+    pairs = [(p[i], p[i + 1] if i + 1 < len(p) else None) for i in range(0, len(p), 2)]
+    worked = sum(int((b - a).total_seconds() // 60) for a, b in pairs if b)
+    return {"first": _hhmm(p[0], day), "last": _hhmm(p[-1], day), "punches": len(p),
+            "shift": inst["shift"], "worked": worked,
+            "pairs": [(_hhmm(a, day), _hhmm(b, day) if b else None) for a, b in pairs],
+            "flags": _flags(p, rules or anomalies.rules(), terminal or {})}
+
+def summarise(records, emp_code, start_date, end_date):
+    """{shift day: slot} for one employee, keeping shift days inside the window."""
+    want = str(emp_code).strip()
+    rules = anomalies.rules()
+    stamps, terminal = [], {}
+    for r in records:
+        if str(r.get("emp_code", "")).strip() != want:
+            continue
+        t = parse(r.get("punch_time") or r.get("upload_time"))
+        if t:
+            stamps.append(t)
+            flag = anomalies.terminal_flag(rules, r.get("terminal_sn"), r.get("terminal_alias"))
+            if flag:
+                terminal[t] = flag
+    out = {}
+    for inst in instances(stamps):
+        day = inst["day"].strftime("%Y-%m-%d")
+        if not (start_date <= day <= end_date):
+            continue
+        slot, prev = describe(inst, rules, terminal), out.get(day)
+        if prev:  # two shifts starting the same day (e.g. a double shift)
+            slot = {"first": prev["first"], "last": slot["last"], "punches": prev["punches"] + slot["punches"],
+                    "shift": " + ".join(x for x in (prev["shift"], slot["shift"]) if x),
+                    "worked": prev["worked"] + slot["worked"], "pairs": prev["pairs"] + slot["pairs"],
+                    "flags": prev["flags"] | slot["flags"]}
+        out[day] = slot
+    return out
+
+def fetch_window(start_date, end_date):
+    """Calendar days to download so shifts crossing midnight at either edge are complete."""
+    if not enabled():
+        return start_date, end_date
+    d = lambda s, n: (datetime.strptime(s, "%Y-%m-%d") + timedelta(days=n)).strftime("%Y-%m-%d")
+    return d(start_date, -1), d(end_date, 1)
+
+def sort_key(hhmm):
+    """Orders "HH:MM" and "HH:MM+1" / "HH:MM-1" report times chronologically."""
+    return int(hhmm[5:] or 0), hhmm[:5]
+
+def fmt_pairs(pairs):
+    return ", ".join(f"{a}-{b or '?'}" for a, b in pairs)
+
+def fmt_minutes(m):
+    return f"{m // 60}:{m % 60:02d}"
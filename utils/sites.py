@@ -0,0 +1,54 @@
+# File: utils/sites.py
+# The ZKBioTime servers we talk to. config.SITES lists them; without it the
+# single BASE_URL/USERNAME/PASSWORD server is the only ("Main") site.
+from urllib.parse import urlsplit
+
+import config
+from utils.appdata import load_json, save_json
+
+DEFAULT_NAME = "Main"
+
+def all_sites():
+    configured = getattr(config, "SITES", None) or []
+    if configured:
+        return [dict(s) for s in configured]
+    return [{"name": DEFAULT_NAME, "base_url": config.BASE_URL,
+             "username": config.USERNAME, "password": config.PASSWORD}]
+
+def names():
+    return [s["name"] for s in all_sites()]
+
+def primary():
+    return all_sites()[0]["name"]
+
+def is_multi():
+    return len(all_sites()) > 1
+
+def get(name=None):
+    name = name or primary()
+    for s in all_sites():
+        if s["name"] == name:
+            return s
+    raise KeyError(f"Unknown site: {name}")
+
+def base_url(name=None):
+    return get(name)["base_url"].rstrip("/")
+
+def for_url(url):
+    """Site name owning url (matched on host:port); primary if none matches."""
+    host = urlsplit(url).netloc
+    for s in all_sites():
+        if urlsplit(s["base_url"]).netloc == host:
+            return s["name"]
+    return primary()
+
+def selected():
+    """Sites the operator picked for lookups/reports (all by default)."""
+    known = names()
+    picked = [n for n in load_json("settings.json").get("sites_selected", []) if n in known]
+    return picked or known
+
+def set_selected(picked):
+    settings = load_json("settings.json")
+    settings["sites_selected"] = list(picked)
+    save_json("settings.json", settings)
@@ -0,0 +1,50 @@
+# File: utils/snapshot.py
+# Last-known-good copies of server data on disk, so read views still have
+# something to show (marked stale) when the server is slow or unreachable.
+import os, json, time
+from datetime import datetime
+
+from utils.appdata import appdata_dir
+
+def _path(name):
+    return os.path.join(appdata_dir("cache"), f"{name}.json")
+
+def save(name, data):
+    path = _path(name)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "data": data}, f)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[WARN] Could not save snapshot {name}:", e)
+
+def load(name):
+    """Returns (data, saved_at) or (None, None)."""
+    try:
+        with open(_path(name), "r", encoding="utf-8") as f:
+            blob = json.load(f)
+        return blob.get("data"), blob.get("saved_at")
+    except Exception:
+        return None, None
+
+def cached(name, fetch):
+    """
+    Call fetch(); on success save and return (data, None).
+    On any error fall back to the saved copy: (data, saved_at) - saved_at set means stale.
+    """
+    try:
+        data = fetch()
+        save(name, data)
+        return data, None
+    except Exception as e:
+        print(f"[WARN] {name}: live fetch failed ({e}); using last saved copy")
+        data, saved_at = load(name)
+        return data, (saved_at or 0)
+
+def stale_text(saved_at):
+    if saved_at is None:
+        return ""
+    if not saved_at:
+        return "OFFLINE - no saved copy"
+    return "OFFLINE - data from " + datetime.fromtimestamp(saved_at).strftime("%Y-%m-%d %H:%M")
@@ -1,19 +1,23 @@
 # utils/state.py
-_token = None  # Only declared once
+# One token per site (see utils/sites.py); site=None means the primary site.
+from utils import sites
 
-def set_token(t):
-    global _token
-    _token = t
-    print("[DEBUG] Token SET:", _token)
+_tokens = {}  # site name -> token
 
-def get_token():
-    print("[DEBUG] Token GET:", _token)
-    return _token
+def set_token(t, site=None):
+    site = site or sites.primary()
+    _tokens[site] = t
+    print(f"[DEBUG] Token SET ({site}):", t)
 
-def get_auth_headers():
+def get_token(site=None):
+    t = _tokens.get(site or sites.primary())
+    print("[DEBUG] Token GET:", t)
+    return t
+
+def get_auth_headers(site=None):
     headers = {
         "Content-Type": "application/json",
-        "Authorization": f"Token {_token}"  # or 'Bearer' if needed
+        "Authorization": f"Token {_tokens.get(site or sites.primary())}"  # or 'Bearer' if needed
     }
     print("[DEBUG] Auth Headers:", headers)
     return headers